@@ -1,37 +1,83 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, make_response
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-from pymongo import MongoClient
+import gzip
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from common.background_writer import BackgroundWriter
+from common.connections import get_mongo_db
+from common.snapshot_store import SnapshotStore
 from search.normal_search import NormalSearch
 from search.personal_search import PersonalSearch
 from search.page_partition import PagePartition
-from elasticsearch import Elasticsearch
-es = Elasticsearch(
-    hosts=["http://localhost:9200"],
-    basic_auth=("elastic", "ZCjtuz7ZKNWy7u5DaOId")
-)
+from search.search_cache import SearchCache
+from search.suggest import TitleSuggester
+from search.title_index import TitleIndex
 
 app = Flask(__name__)
 app.secret_key = 'nku_infohub_secret_key'
 
 # MongoDB连接
-mongo_client = MongoClient('localhost', 27017)
-db = mongo_client['nku_news']
+db = get_mongo_db()
 users_col = db['users']
 profiles_col = db['user_profiles']
 history_col = db['search_history']
+# 搜索日志由后台线程批量写入，不占用请求时间
+history_writer = BackgroundWriter(history_col, max_queue=10000, batch_size=200, flush_interval=1.0)
 
 # 搜索对象
 normal_search = NormalSearch()
 page_partition = PagePartition(results_per_page=10)
 
+def get_index_generation():
+    meta = db['index_meta'].find_one({'_id': normal_search.index_name})
+    return meta.get('generation') if meta else None
+
+# 搜索结果缓存，索引重建后自动失效
+search_cache = SearchCache(
+    max_entries=2000,
+    max_bytes=64 * 1024 * 1024,
+    ttl=600,
+    generation_fn=get_index_generation
+)
+
+# 网页快照，热门快照渲染并压缩好的响应保存在内存中
+snapshot_store = SnapshotStore(db)
+snapshot_cache = SearchCache(max_entries=64, max_bytes=32 * 1024 * 1024, ttl=3600)
+
+# 标题补全：索引没有增量更新过时优先查全量构建生成的本地前缀索引（mmap），否则或未命中时查ES，ES结果缓存到索引更新
+title_suggester = TitleSuggester(
+    index_name=normal_search.index_name,
+    generation_fn=get_index_generation,
+    local_index=TitleIndex()
+)
+
 def get_current_user():
     return session.get('user')
 
+# 用户画像缓存，/profile 修改时同步更新
+profile_cache = SearchCache(max_entries=10000, max_bytes=16 * 1024 * 1024, ttl=300)
+
 def get_user_profile(username):
-    profile = profiles_col.find_one({'username': username})
-    return profile or {}
+    profile = profile_cache.get(username)
+    if profile is None:
+        profile = profiles_col.find_one({'username': username}, {'_id': 0}) or {}
+        profile_cache.set(username, profile)
+    return profile
+
+def search_profile(profile):
+    """个性化只用到角色和学院，登录时写入session，搜索时不再读取画像"""
+    return {key: profile[key] for key in ('role', 'college') if key in profile}
+
+def get_search_profile(user):
+    if 'profile' in user:
+        return user['profile']
+    # 更新前登录的session里没有画像
+    return search_profile(get_user_profile(user['username']))
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -65,24 +111,29 @@ def index():
 
     # 查询
     if query:
-        # 记录查询日志
+        # 记录查询日志（后台批量写入）
         if user:
-            history_col.insert_one({
+            history_writer.add({
                 "username": user['username'],
                 "query": query,
                 "search_in": search_in,
                 "sort_by": sort_by,
                 "timestamp": datetime.now()
             })
-        # 普通/个性化查询
-        if personalized and user:
-            user_profile = get_user_profile(user['username'])
-            search_results = normal_search.execute_search(mode, query, search_in, sort_by, filetypes)
-            results = PersonalSearch(user_profile).personalize_results(search_results, sort_by)
-        else:
-            results = normal_search.execute_search(mode, query, search_in, sort_by, filetypes)
-        # 分页
-        page_info = page_partition.process_results(results, page)
+        # 普通/个性化查询：分页交给ES，只取当前页；个性化打分在ES中完成
+        personal_search = PersonalSearch(get_search_profile(user)) if personalized and user else None
+        # 个性化结果按 (角色, 学院) 缓存，同一学院同一身份的用户共享，热门查询直接命中缓存
+        cohort = personal_search.cohort() if personal_search else ()
+        cache_key = SearchCache.make_key(mode, query, search_in, sort_by, filetypes, page, *cohort)
+        search_page = search_cache.get_or_compute(
+            cache_key,
+            lambda: normal_search.search_page(
+                mode, query, search_in, sort_by, filetypes,
+                page=page, page_size=page_partition.RESULTS_PER_PAGE,
+                personal_search=personal_search
+            )
+        )
+        page_info = page_partition.process_page(search_page['results'], search_page['total'], page)
         results = page_info['results']
         total = page_info['total']
         page_range = page_info['page_range']
@@ -113,10 +164,12 @@ def auth():
             password = request.form.get('password', '').strip()
             user = users_col.find_one({'username': username})
             if user and check_password_hash(user['password'], password):
+                profile = get_user_profile(user['username'])
                 session['user'] = {
                     'username': user['username'],
                     'email': user.get('email', ''),
-                    'role': get_user_profile(user['username']).get('role', '')
+                    'role': profile.get('role', ''),
+                    'profile': search_profile(profile)
                 }
                 return redirect(url_for('index'))
             else:
@@ -194,11 +247,13 @@ def profile():
             'grade': grade,
             'research': research
         }
-        profiles_col.update_one({'username': user['username']}, {'$set': update_fields})
+        result = profiles_col.update_one({'username': user['username']}, {'$set': update_fields})
         update_success = '信息已更新'
-        # 刷新session中的email
-        session['user']['email'] = email
-        profile = get_user_profile(user['username'])
+        # 同步更新画像缓存和session中的email、画像
+        if result.matched_count:
+            profile = {**profile, **update_fields}
+            profile_cache.set(user['username'], profile)
+        session['user'] = {**user, 'email': email, 'profile': search_profile(profile)}
     return render_template(
         'profile.html',
         user=session['user'],
@@ -222,46 +277,79 @@ def logs():
         })
     return render_template('logs.html', user=user, logs=logs)
 
-@app.route('/snap/<snapshot_hash>')
-def snap(snapshot_hash):
-    snap_doc = db['WEB_snapshot'].find_one({'content_hash': snapshot_hash})
-    if not snap_doc:
-        return "快照不存在", 404
-    url = snap_doc.get('url', '')
-    captured_at = snap_doc.get('captured_at', '')
-    source = snap_doc.get('source', '')
-    raw_html = snap_doc.get('html_content', '<div style="color:red;">无快照内容</div>')
-    return render_template(
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify({
+        'search': search_cache.stats(),
+        'suggest': title_suggester.cache.stats(),
+        'profile': profile_cache.stats(),
+        'history_writer': history_writer.stats(),
+        'snapshot': snapshot_cache.stats()
+    })
+
+def choose_encoding(accept_encodings):
+    """按客户端支持的压缩方式选择响应编码，优先 brotli"""
+    if brotli is not None and 'br' in accept_encodings:
+        return 'br'
+    if 'gzip' in accept_encodings:
+        return 'gzip'
+    return None
+
+def render_snapshot(snapshot_hash, encoding):
+    """渲染快照页面并按 encoding 压缩，快照不存在时返回 None"""
+    snapshot = snapshot_store.load(snapshot_hash)
+    if not snapshot:
+        return None
+    body = render_template(
         'snap.html',
-        url=url,
-        captured_at=captured_at,
-        source=source,
-        raw_html=raw_html
-    )
+        url=snapshot['url'],
+        captured_at=snapshot['captured_at'],
+        source='',
+        raw_html=snapshot['html'] or '<div style="color:red;">无快照内容</div>'
+    ).encode('utf-8')
+    if encoding == 'br':
+        body = brotli.compress(body, quality=5)
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=6)
+    return body
 
-from flask import request, jsonify
+@app.route('/snap/<snapshot_hash>')
+def snap(snapshot_hash):
+    # 强ETag由内容哈希加响应编码组成，不同压缩方式的响应体各有自己的ETag，重复访问不需要查库
+    encoding = choose_encoding(request.accept_encodings)
+    etag = f"{snapshot_hash}-{encoding or 'identity'}"
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        key = (snapshot_hash, encoding)
+        body = snapshot_cache.get(key)
+        if body is None:
+            body = render_snapshot(snapshot_hash, encoding)
+            if body is None:
+                return "快照不存在", 404
+            snapshot_cache.set(key, body)
+        response = make_response(body)
+        response.content_type = 'text/html; charset=utf-8'
+        if encoding:
+            response.content_encoding = encoding
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
 
 @app.route('/suggest')
 def suggest():
     q = request.args.get('q', '').strip()
     if not q:
         return jsonify([])
-    body = {
-        "suggest": {
-            "title-suggest": {
-                "prefix": q,
-                "completion": {
-                    "field": "suggest",
-                    "size": 10
-                }
-            }
-        }
-    }
     try:
-        res = es.search(index="nankai_news_index", body=body)
-        options = res.get('suggest', {}).get('title-suggest', [])[0].get('options', [])
-        suggestions = [opt['text'] for opt in options]
-        return jsonify(suggestions)
+        response = jsonify(title_suggester.suggest(q))
+        # 同一前缀的补全结果短时间内不会变化，允许浏览器和代理缓存
+        response.cache_control.public = True
+        response.cache_control.max_age = 300
+        return response
     except Exception as e:
         print("Suggest error:", e)
         return jsonify([]), 500
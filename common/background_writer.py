@@ -0,0 +1,98 @@
+# 后台批量写入：请求线程只把文档放进有界队列，后台线程攒批后用 insert_many 写入MongoDB
+#
+# 队列满时直接丢弃并计数，不会阻塞请求；进程退出时（atexit）把队列中剩余的文档写完。
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    def __init__(self, collection, max_queue=10000, batch_size=200, flush_interval=1.0):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        # 写入统计
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+        atexit.register(self.close)
+
+    def add(self, document):
+        """加入一条待写入的文档，队列已满时丢弃并返回 False"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(document)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _ensure_started(self):
+        # 后台线程不会随 fork 复制，gunicorn 等预加载应用的 worker 需要自己启动
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                if self._pid is not None:
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._thread = threading.Thread(target=self._run, name='background-writer', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._write(batch)
+                return
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logging.error(f"Background insert into {self.collection.name} failed: {str(e)}")
+
+    def close(self, timeout=10):
+        """停止后台线程，写完队列中剩余的文档"""
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
@@ -0,0 +1,95 @@
+# Elasticsearch / MongoDB 连接工厂：全进程共享带连接池的客户端，参数从环境变量读取
+#
+# Web服务、索引程序和爬虫各自按负载设置环境变量即可，例如：
+#   ES_HOSTS=http://es1:9200,http://es2:9200  ES_CONNECTIONS_PER_NODE=32
+#   MONGO_URI=mongodb://localhost:27017/  MONGO_MAX_POOL_SIZE=50
+import os
+import threading
+
+from elasticsearch import Elasticsearch
+from pymongo import MongoClient
+
+_lock = threading.Lock()
+_clients = {}  # 名称 -> (创建时的进程号, 客户端)
+
+
+def _env_str(name, default):
+    return os.environ.get(name, default)
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _get_or_create(name, factory):
+    """按名称懒加载客户端；fork 出的子进程（如gunicorn worker）会重新创建自己的连接池"""
+    pid = os.getpid()
+    entry = _clients.get(name)
+    if entry and entry[0] == pid:
+        return entry[1]
+    with _lock:
+        entry = _clients.get(name)
+        if entry and entry[0] == pid:
+            return entry[1]
+        client = factory()
+        _clients[name] = (pid, client)
+        return client
+
+
+def _create_es():
+    hosts = [host.strip() for host in _env_str('ES_HOSTS', 'http://localhost:9200').split(',') if host.strip()]
+    # 只有设置了 ES_PASSWORD 才启用认证，密码不写在代码里
+    password = _env_str('ES_PASSWORD', None)
+    return Elasticsearch(
+        hosts=hosts,
+        basic_auth=(_env_str('ES_USERNAME', 'elastic'), password) if password else None,
+        connections_per_node=_env_int('ES_CONNECTIONS_PER_NODE', 10),
+        request_timeout=_env_int('ES_REQUEST_TIMEOUT', 10),
+        max_retries=_env_int('ES_MAX_RETRIES', 3),
+        retry_on_timeout=_env_bool('ES_RETRY_ON_TIMEOUT', True),
+        http_compress=_env_bool('ES_HTTP_COMPRESS', True)
+    )
+
+
+def _create_mongo_client():
+    return MongoClient(
+        _env_str('MONGO_URI', 'mongodb://localhost:27017/'),
+        maxPoolSize=_env_int('MONGO_MAX_POOL_SIZE', 100),
+        minPoolSize=_env_int('MONGO_MIN_POOL_SIZE', 0),
+        connectTimeoutMS=_env_int('MONGO_CONNECT_TIMEOUT_MS', 5000),
+        serverSelectionTimeoutMS=_env_int('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000),
+        socketTimeoutMS=_env_int('MONGO_SOCKET_TIMEOUT_MS', None),
+        retryWrites=_env_bool('MONGO_RETRY_WRITES', True)
+    )
+
+
+def get_es():
+    """获取共享的Elasticsearch客户端，单次调用需要更长超时时用 get_es().options(request_timeout=...)"""
+    return _get_or_create('es', _create_es)
+
+
+def get_mongo_client():
+    """获取共享的MongoClient"""
+    return _get_or_create('mongo', _create_mongo_client)
+
+
+def get_mongo_db(name=None):
+    """获取数据库，默认为 MONGO_DB（nku_news）"""
+    return get_mongo_client()[name or _env_str('MONGO_DB', 'nku_news')]
+
+
+def close_connections():
+    """关闭本进程创建的所有客户端，供脚本退出前调用"""
+    with _lock:
+        for pid, client in _clients.values():
+            if pid == os.getpid():
+                client.close()
+        _clients.clear()
@@ -0,0 +1,124 @@
+# 网页快照存储：每个内容哈希只存一份压缩后的HTML（WEB_snapshot_body），
+# 每次抓取只在 WEB_snapshot 中记录 URL、内容哈希和抓取时间
+#
+# 安装了 zstandard 时用 zstd 压缩，否则用 gzip；读取时按文档中记录的编码解压，两种可以混存。
+import gzip
+import hashlib
+from datetime import datetime
+
+from bson.binary import Binary
+from pymongo import ASCENDING, DESCENDING, InsertOne, UpdateOne
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ENCODING = 'zstd' if zstandard is not None else 'gzip'
+
+
+def compress(text):
+    data = text.encode('utf-8')
+    if ENCODING == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data, encoding):
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read zstd-compressed snapshots')
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif encoding == 'gzip':
+        data = gzip.decompress(data)
+    return data.decode('utf-8')
+
+
+class SnapshotStore:
+    def __init__(self, db):
+        self.capture_collection = db['WEB_snapshot']  # 抓取记录：url, content_hash, captured_at
+        self.body_collection = db['WEB_snapshot_body']  # _id 为内容哈希，压缩后的HTML
+
+    def create_indexes(self):
+        self.capture_collection.create_index([('url', ASCENDING), ('captured_at', DESCENDING)])
+        # 索引程序按内容哈希查抓取时间，未迁移的旧快照也按内容哈希读取
+        self.capture_collection.create_index([('content_hash', ASCENDING)])
+
+    def capture_operations(self, url, html_content, content_hash, captured_at=None):
+        """一次抓取对应的写操作 [(集合, 操作)]，交给调用方批量提交
+
+        正文用 $setOnInsert 写入，相同内容重复抓取时不会覆盖也不会多存一份。
+        """
+        captured_at = captured_at or datetime.now()
+        body = compress(html_content)
+        return [
+            (self.body_collection, UpdateOne(
+                {'_id': content_hash},
+                {'$setOnInsert': {
+                    'url': url,
+                    'captured_at': captured_at,
+                    'encoding': ENCODING,
+                    'size': len(html_content),
+                    'body': Binary(body)
+                }},
+                upsert=True
+            )),
+            (self.capture_collection, InsertOne({
+                'url': url,
+                'content_hash': content_hash,
+                'captured_at': captured_at
+            }))
+        ]
+
+    def load(self, content_hash):
+        """按内容哈希读取快照，返回 {'url', 'captured_at', 'html'}，不存在时返回 None"""
+        doc = self.body_collection.find_one({'_id': content_hash})
+        if doc:
+            return {
+                'url': doc.get('url', ''),
+                'captured_at': doc.get('captured_at', ''),
+                'html': decompress(doc['body'], doc.get('encoding'))
+            }
+        # 尚未迁移的旧快照，HTML 直接存在抓取记录中
+        legacy = self.capture_collection.find_one({'content_hash': content_hash, 'html_content': {'$exists': True}})
+        if legacy:
+            return {
+                'url': legacy.get('url', ''),
+                'captured_at': legacy.get('captured_at', ''),
+                'html': legacy['html_content']
+            }
+        return None
+
+    def migrate_legacy(self, batch_size=200):
+        """把旧格式快照（每条记录带完整 html_content）转成压缩正文 + 抓取记录，返回迁移条数
+
+        按 _id 顺序分批，每批从上一批最后的 _id 之后继续，已迁移的记录不会被重复扫描。
+        """
+        migrated = 0
+        last_id = None
+        while True:
+            query = {'html_content': {'$exists': True}}
+            if last_id is not None:
+                query['_id'] = {'$gt': last_id}
+            docs = list(self.capture_collection.find(
+                query,
+                {'url': 1, 'html_content': 1, 'content_hash': 1, 'captured_at': 1}
+            ).sort('_id', 1).limit(batch_size))
+            if not docs:
+                return migrated
+            last_id = docs[-1]['_id']
+            body_operations = []
+            capture_operations = []
+            for doc in docs:
+                # 与爬虫一致，缺少哈希的旧记录按HTML的MD5补上
+                content_hash = doc.get('content_hash') or hashlib.md5(doc['html_content'].encode('utf-8')).hexdigest()
+                operations = self.capture_operations(
+                    doc.get('url', ''), doc['html_content'], content_hash, doc.get('captured_at'))
+                body_operations.append(operations[0][1])
+                capture_operations.append(UpdateOne(
+                    {'_id': doc['_id']},
+                    {'$set': {'content_hash': content_hash}, '$unset': {'html_content': ''}}
+                ))
+            self.body_collection.bulk_write(body_operations, ordered=False)
+            self.capture_collection.bulk_write(capture_operations, ordered=False)
+            migrated += len(docs)
@@ -1,12 +1,16 @@
 # 用于清洗 MongoDB 中的 Document 集合数据
-from pymongo import MongoClient
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.connections import get_mongo_db
 
 
 class MongoDBCleaner:
-    def __init__(self, db_name, collection_name):
-        # 连接到 MongoDB
-        self.client = MongoClient('mongodb://localhost:27017/')
-        self.db = self.client[db_name]
+    def __init__(self, collection_name, db_name=None):
+        # 连接到 MongoDB，默认使用 MONGO_DB 指定的数据库
+        self.db = get_mongo_db(db_name)
         self.collection = self.db[collection_name]
 
     def clean_data(self):
@@ -28,10 +32,10 @@ class MongoDBCleaner:
                 if 'filename' in doc:
                     filetype = doc['filename'].split('.')[-1] if '.' in doc['filename'] else 'unknown'
 
-                # 构造更新操作
+                # 构造更新操作，updated_at 供索引程序增量同步
                 update_query = {
                     '$unset': {'chunkSize': ""},  # 删除 chunkSize 字段
-                    '$set': {'filetype': filetype}  # 添加 filetype 字段
+                    '$set': {'filetype': filetype, 'updated_at': datetime.now()}  # 添加 filetype 字段
                 }
 
                 # 执行更新
@@ -46,8 +50,7 @@ class MongoDBCleaner:
 
 
 if __name__ == "__main__":
-    db_name = "nku_news"
     collection_name = "fs.files"
 
-    cleaner = MongoDBCleaner(db_name, collection_name)
+    cleaner = MongoDBCleaner(collection_name)
     cleaner.clean_data()
@@ -1,11 +1,15 @@
 # 用于测试和批量清洗 NEWS 集合中的数据，支持样本测试和全量清洗。
-from pymongo import MongoClient
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.connections import get_mongo_db, close_connections
 
 
 def test_cleaning_on_sample():
     # 连接MongoDB
-    client = MongoClient('mongodb://localhost:27017/')  # 替换成你的MongoDB连接字符串
-    db = client['nku_news']  # 替换成你的数据库名
+    db = get_mongo_db()  # 连接参数见 common/connections.py
     collection = db['NEWS']  # 替换成你的集合名
 
     # 获取前10条数据的ID
@@ -34,7 +38,8 @@ def test_cleaning_on_sample():
                             'find': '来源：',
                             'replacement': ''
                         }
-                    }
+                    },
+                    'updated_at': datetime.now()  # 供索引程序增量同步
                 }
             }]
         )
@@ -69,7 +74,8 @@ def test_cleaning_on_sample():
                                     'find': '来源：',
                                     'replacement': ''
                                 }
-                            }
+                            },
+                            'updated_at': datetime.now()
                         }
                     }]
                 )
@@ -88,7 +94,7 @@ def test_cleaning_on_sample():
         print(f"发生错误: {str(e)}")
 
     finally:
-        client.close()
+        close_connections()
 
 
 if __name__ == "__main__":
@@ -1,12 +1,26 @@
 # 对 NEWS 集合中的数据进行实际的去重操作，包括基于 URL 和内容的去重
-from pymongo import MongoClient
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.connections import get_mongo_db, close_connections
 from bson.objectid import ObjectId
+from datetime import datetime
+from pymongo import UpdateOne
+
+
+def record_tombstones(db, ids):
+    """记录被删除的文档，增量索引（index.py --incremental）据此从ES中删除"""
+    deleted_at = datetime.now()
+    db['index_tombstones'].bulk_write([
+        UpdateOne({'_id': str(doc_id)}, {'$set': {'collection': 'NEWS', 'deleted_at': deleted_at}}, upsert=True)
+        for doc_id in ids
+    ], ordered=False)
 
 
 def remove_duplicates():
     # 连接MongoDB
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['nku_news']
+    db = get_mongo_db()
     collection = db['NEWS']
 
     try:
@@ -34,6 +48,7 @@ def remove_duplicates():
             ids_to_remove = [id for id in dup["ids"] if id != dup["first_id"]]
             if ids_to_remove:
                 result = collection.delete_many({"_id": {"$in": ids_to_remove}})
+                record_tombstones(db, ids_to_remove)
                 url_dups_removed += result.deleted_count
                 print(f"删除了 {result.deleted_count} 条URL重复的文档")
 
@@ -56,6 +71,7 @@ def remove_duplicates():
             ids_to_remove = [id for id in dup["ids"] if id != dup["first_id"]]
             if ids_to_remove:
                 result = collection.delete_many({"_id": {"$in": ids_to_remove}})
+                record_tombstones(db, ids_to_remove)
                 content_dups_removed += result.deleted_count
                 print(f"删除了 {result.deleted_count} 条内容重复的文档")
 
@@ -87,7 +103,7 @@ def remove_duplicates():
         print(traceback.format_exc())
 
     finally:
-        client.close()
+        close_connections()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,36 @@
+# 把 WEB_snapshot 中旧格式的快照（每次抓取都存一份完整HTML）迁移为按内容哈希去重的压缩存储
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.connections import get_mongo_db, close_connections
+from common.snapshot_store import SnapshotStore
+
+
+def compress_snapshots():
+    db = get_mongo_db()
+    store = SnapshotStore(db)
+
+    try:
+        before = db.command('collStats', 'WEB_snapshot').get('storageSize', 0)
+        print(f"迁移前 WEB_snapshot 占用: {before / 1024 / 1024:.1f} MB")
+
+        store.create_indexes()
+        migrated = store.migrate_legacy()
+        print(f"已迁移 {migrated} 条快照，去重后正文 {store.body_collection.estimated_document_count()} 份")
+
+        # 删除字段后空间不会自动归还给操作系统，compact 之后才会释放
+        db.command('compact', 'WEB_snapshot')
+        after = db.command('collStats', 'WEB_snapshot').get('storageSize', 0)
+        bodies = db.command('collStats', 'WEB_snapshot_body').get('storageSize', 0)
+        print(f"迁移后 WEB_snapshot 占用: {after / 1024 / 1024:.1f} MB，WEB_snapshot_body 占用: {bodies / 1024 / 1024:.1f} MB")
+
+    except Exception as e:
+        print(f"迁移过程中出错: {str(e)}")
+
+    finally:
+        close_connections()
+
+
+if __name__ == "__main__":
+    compress_snapshots()
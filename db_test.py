@@ -1,9 +1,9 @@
 # MongoDB数据库连接测试
-from pymongo import MongoClient
+from common.connections import get_mongo_client
 
 def test_mongodb_connection():
     try:
-        client = MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=3000)
+        client = get_mongo_client()
         # 尝试获取服务器信息
         info = client.server_info()
         print("MongoDB 连接成功！")
@@ -1,42 +1,64 @@
-import pymongo
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
-from datetime import datetime
+import argparse
+import os
+import re
+import sys
+import time
+from elasticsearch.helpers import parallel_bulk, scan
+from datetime import datetime, timedelta
+from pymongo import ASCENDING
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.connections import get_es, get_mongo_db, close_connections
+from search.personal_search import PersonalSearch
+from search.title_index import DEFAULT_PATH as TITLE_INDEX_PATH, load_query_counts, title_weight, write_title_index
 
 
 class NewsIndexer:
+    DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+    # 游标只取建索引需要的字段
+    FILE_PROJECTION = {'title': 1, 'url': 1, 'filetype': 1, 'filename': 1, 'upload_date': 1}
+    NEWS_PROJECTION = {'title': 1, 'url': 1, 'content': 1, 'source': 1, 'date': 1, 'snapshot_hash': 1}
+    # 同步水位的安全余量，需大于爬虫缓冲写入的最长时间（BulkWriter 默认 5 秒提交一次）及各机器的时钟误差
+    WATERMARK_LAG = timedelta(minutes=5)
+
     def __init__(self,
-                 mongo_host='localhost',
-                 mongo_port=27017,
-                 mongo_db='nku_news',
-                 es_host='localhost',
-                 es_port=9200,
+                 mongo_db=None,
                  index_name='nankai_news_index'):
-        # MongoDB连接
-        self.mongo_client = pymongo.MongoClient(mongo_host, mongo_port)
-        self.mongo_db = self.mongo_client[mongo_db]
+        # MongoDB连接，默认使用 MONGO_DB 指定的数据库
+        self.mongo_db = get_mongo_db(mongo_db)
         self.news_collection = self.mongo_db['NEWS']
         self.documents_collection = self.mongo_db['fs.files']
         self.snapshot_collection = self.mongo_db['WEB_snapshot']
+        self.history_collection = self.mongo_db['search_history']
 
-        # 构建快照字典
-        self.snapshot_dict = {doc['content_hash']: doc for doc in self.snapshot_collection.find()}
-
-        # Elasticsearch连接
-        self.es = Elasticsearch(
-            [f'http://{es_host}:{es_port}'],
-            basic_auth=('elastic', 'ZCjtuz7ZKNWy7u5DaOId'),
+        # Elasticsearch连接，批量写入需要更长的超时
+        self.es = get_es().options(
             request_timeout=300,
             max_retries=3,
             retry_on_timeout=True
         )
+        # 搜索端查询的是别名，每次重建写入新的版本索引，完成后原子切换别名
+        self.alias_name = index_name
         self.index_name = index_name
 
-    def create_index(self):
-        """创建Elasticsearch索引"""
+        # 导入完成后恢复的副本数和刷新间隔
+        self.number_of_replicas = 2
+        self.refresh_interval = "1s"
+
+        # 标题补全的热度权重来自搜索历史
+        self.query_counts = None
+
+    def create_index(self, bulk_load=True):
+        """创建带时间戳的新版本Elasticsearch索引，如 nankai_news_index_v20261018103000
+
+        bulk_load 为 True 时以 0 副本、关闭刷新的状态创建，导入结束后由 finish_bulk_load 恢复。
+        线上查询的别名在 swap_alias 之前始终指向旧版本。
+        """
+        self.index_name = f"{self.alias_name}_v{datetime.now().strftime('%Y%m%d%H%M%S')}"
         settings = {
             "index": {
-                "number_of_replicas": 2,
+                "number_of_replicas": 0 if bulk_load else self.number_of_replicas,
+                "refresh_interval": "-1" if bulk_load else self.refresh_interval,
                 "number_of_shards": 1
             },
             "analysis": {
@@ -86,6 +108,8 @@ class NewsIndexer:
                 "filetype": {"type": "keyword"},
                 "filename": {"type": "keyword"},
                 "upload_date": {"type": "date", "format": "yyyy-MM-dd HH:mm:ss||yyyy-MM-dd'T'HH:mm:ss.SSS'Z'"},
+                # 文档中出现的个性化规则关键词（角色标签、学院名称及其变体、学院关键词），供个性化打分脚本使用
+                "persona_terms": {"type": "keyword"},
                 "suggest": {
                     "type": "completion",
                     "analyzer": "ik_max_word",
@@ -94,9 +118,6 @@ class NewsIndexer:
             }
         }
 
-        if self.es.indices.exists(index=self.index_name):
-            self.es.indices.delete(index=self.index_name)
-
         self.es.indices.create(
             index=self.index_name,
             body={
@@ -105,39 +126,59 @@ class NewsIndexer:
             }
         )
 
-    def prepare_documents(self):
-        """准备所有类型的索引文档"""
-        documents = []
-
+    def prepare_documents(self, batch_size=500):
+        """逐条生成所有类型的索引文档"""
         # 1. 处理文档集合
-        for doc in self.documents_collection.find():
-            upload_date = doc.get('upload_date', '')
-            # 格式化 upload_date
-            if isinstance(upload_date, datetime):
-                upload_date = upload_date.strftime("%Y-%m-%d %H:%M:%S")
-            elif isinstance(upload_date, str):
-                # 可选：尝试截断微秒部分
-                if 'T' in upload_date and '.' in upload_date:
-                    upload_date = upload_date.split('.')[0].replace('T', ' ')
-            documents.append({
-                "_id": str(doc['_id']),
-                "title": doc.get('title', ''),
-                "url": doc.get('url', ''),
-                "filetype": doc.get('filetype', ''),
-                "filename": doc.get('filename', ''),
-                "upload_date":upload_date,
-                "suggest": {"input": [doc.get('title', '')], "weight": 10}
-            })
+        for doc in self.documents_collection.find({}, self.FILE_PROJECTION, batch_size=batch_size):
+            yield self._build_file_document(doc)
+
+        # 2. 处理NEWS集合，按批查询快照捕获时间
+        batch = []
+        for doc in self.news_collection.find({}, self.NEWS_PROJECTION, batch_size=batch_size):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield from self._build_news_documents(batch)
+                batch = []
+        if batch:
+            yield from self._build_news_documents(batch)
 
-        # 2. 处理NEWS集合
-        for doc in self.news_collection.find():
+    def _suggest(self, title):
+        """补全字段，权重为标题的搜索热度"""
+        if self.query_counts is None:
+            self.query_counts = load_query_counts(self.history_collection)
+        return {"input": [title], "weight": title_weight(title, self.query_counts)}
+
+    def _build_file_document(self, doc):
+        upload_date = doc.get('upload_date', '')
+        # 格式化 upload_date
+        if isinstance(upload_date, datetime):
+            upload_date = upload_date.strftime("%Y-%m-%d %H:%M:%S")
+        elif isinstance(upload_date, str):
+            # 可选：尝试截断微秒部分
+            if 'T' in upload_date and '.' in upload_date:
+                upload_date = upload_date.split('.')[0].replace('T', ' ')
+        return {
+            "_id": str(doc['_id']),
+            "title": doc.get('title', ''),
+            "url": doc.get('url', ''),
+            "filetype": doc.get('filetype', ''),
+            "filename": doc.get('filename', ''),
+            "upload_date": upload_date,
+            "persona_terms": PersonalSearch.extract_terms(f"{doc.get('title', '')} {doc.get('filename', '')}"),
+            "suggest": self._suggest(doc.get('title', ''))
+        }
+
+    def _build_news_documents(self, news_docs):
+        captured_at_map = self._lookup_captured_at(
+            {doc['snapshot_hash'] for doc in news_docs if doc.get('snapshot_hash')}
+        )
+        for doc in news_docs:
             # 检查date字段格式
             date_str = doc.get('date', '')
             if isinstance(date_str, datetime):
                 date_str = date_str.strftime("%Y-%m-%d")
             elif isinstance(date_str, str):
-                import re
-                if not re.match(r"^\d{4}-\d{2}-\d{2}$", date_str):
+                if not self.DATE_PATTERN.match(date_str):
                     date_str = ""
             else:
                 date_str = ""
@@ -149,73 +190,370 @@ class NewsIndexer:
                 "content": doc.get('content', ''),
                 "source": doc.get('source', ''),
                 "snapshot_hash": doc.get('snapshot_hash', ''),
-                "suggest": {"input": [doc.get('title', '')], "weight": 10}
+                "persona_terms": PersonalSearch.extract_terms(f"{doc.get('title', '')} {doc.get('content', '')}"),
+                "suggest": self._suggest(doc.get('title', ''))
             }
             if date_str:  # 只在有合法日期时添加
                 d["date"] = date_str
             # 关联快照捕获时间
-            snapshot_hash = doc.get('snapshot_hash')
-            if snapshot_hash and snapshot_hash in self.snapshot_dict:
-                snap = self.snapshot_dict[snapshot_hash]
-                captured_at = snap.get("captured_at")
-                # 尝试转为标准格式
-                if isinstance(captured_at, datetime):
-                    d["captured_at"] = captured_at.strftime("%Y-%m-%d %H:%M:%S")
-                elif isinstance(captured_at, str):
-                    d["captured_at"] = captured_at
-            documents.append(d)
-
-        return documents
+            captured_at = captured_at_map.get(doc.get('snapshot_hash'))
+            # 尝试转为标准格式
+            if isinstance(captured_at, datetime):
+                d["captured_at"] = captured_at.strftime("%Y-%m-%d %H:%M:%S")
+            elif isinstance(captured_at, str):
+                d["captured_at"] = captured_at
+            yield d
+
+    def _lookup_captured_at(self, snapshot_hashes):
+        """只读取 content_hash 和 captured_at，不加载快照正文"""
+        if not snapshot_hashes:
+            return {}
+        cursor = self.snapshot_collection.find(
+            {'content_hash': {'$in': list(snapshot_hashes)}},
+            {'_id': 0, 'content_hash': 1, 'captured_at': 1}
+        )
+        return {snap['content_hash']: snap.get('captured_at') for snap in cursor}
+
+    def index_documents(self, thread_count=4, chunk_size=500, max_chunk_bytes=10 * 1024 * 1024, queue_size=4):
+        """流式并行写入ES，返回 (成功数, 失败数, 前100条错误)"""
+        actions = (self._index_action(doc) for doc in self.prepare_documents(batch_size=chunk_size))
+        result = self._bulk(actions, thread_count, chunk_size, max_chunk_bytes, queue_size)
+        self.es.indices.refresh(index=self.index_name)
+        return result
+
+    def _bulk(self, actions, thread_count=4, chunk_size=500, max_chunk_bytes=10 * 1024 * 1024, queue_size=4):
+        success, failed, errors = 0, 0, []
+        for ok, info in parallel_bulk(
+                self.es,
+                actions,
+                thread_count=thread_count,
+                chunk_size=chunk_size,
+                max_chunk_bytes=max_chunk_bytes,
+                queue_size=queue_size,
+                raise_on_error=False
+        ):
+            # 删除一个本来就不存在的文档不算失败
+            if ok or info.get('delete', {}).get('status') == 404:
+                success += 1
+            else:
+                failed += 1
+                if len(errors) < 100:
+                    errors.append(info)
+            if (success + failed) % 10000 == 0:
+                print(f"已写入 {success + failed} 条记录...")
+        return success, failed, errors
+
+    def sync_incremental(self, batch_size=500):
+        """增量同步：只把上次同步之后新增、修改、删除的文档写入ES"""
+        watermark = self._get_meta().get('synced_at')
+        if watermark is None:
+            raise RuntimeError("尚未完成全量索引，请先不带参数运行一次 index.py")
+        self.create_sync_indexes()
+        started = datetime.now()
+        result = self._bulk(self._iter_changed_actions(watermark, batch_size), chunk_size=batch_size)
+        self.save_watermark(started)
+        # 已经同步过的删除记录不再需要
+        self.mongo_db['index_tombstones'].delete_many({'deleted_at': {'$lt': watermark}})
+        # 没有写入任何变更时不换代，Web端的缓存继续有效
+        if result[0]:
+            self.mark_index_rebuilt()
+        return result
+
+    def create_sync_indexes(self):
+        """增量同步按时间戳查询变更，为这些字段建索引，避免每次同步都扫描整个集合"""
+        for field in ('created_at', 'updated_at'):
+            self.news_collection.create_index([(field, ASCENDING)])
+        for field in ('upload_date', 'uploadDate', 'updated_at'):
+            self.documents_collection.create_index([(field, ASCENDING)])
+        self.mongo_db['index_tombstones'].create_index([('deleted_at', ASCENDING)])
+
+    def _iter_changed_actions(self, watermark, batch_size):
+        # 清洗脚本修改已有文档时写入 updated_at
+        changed_files = {'$or': [{'upload_date': {'$gte': watermark}}, {'uploadDate': {'$gte': watermark}},
+                                 {'updated_at': {'$gte': watermark}}]}
+        for doc in self.documents_collection.find(changed_files, self.FILE_PROJECTION, batch_size=batch_size):
+            yield self._index_action(self._build_file_document(doc))
+
+        # 爬虫每次 upsert 都会刷新 created_at
+        changed_news = {'$or': [{'created_at': {'$gte': watermark}}, {'updated_at': {'$gte': watermark}}]}
+        batch = []
+        for doc in self.news_collection.find(changed_news, self.NEWS_PROJECTION, batch_size=batch_size):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield from (self._index_action(d) for d in self._build_news_documents(batch))
+                batch = []
+        if batch:
+            yield from (self._index_action(d) for d in self._build_news_documents(batch))
+
+        # 去重脚本删除的文档
+        for tombstone in self.mongo_db['index_tombstones'].find({'deleted_at': {'$gte': watermark}}):
+            yield {'_op_type': 'delete', '_index': self.index_name, '_id': tombstone['_id']}
+
+    def watch_changes(self, flush_size=500, flush_interval=5, generation_interval=60):
+        """持续监听 NEWS 和 fs.files 的变更流并同步到ES（需要MongoDB副本集）
+
+        索引版本最多每 generation_interval 秒更新一次，避免每次写入都让Web端的搜索结果缓存全部失效。
+        """
+        pipeline = [{'$match': {
+            'ns.coll': {'$in': [self.news_collection.name, self.documents_collection.name]},
+            'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}
+        }}]
+        actions = []
+        last_flush = time.monotonic()
+        changed, last_generation = False, 0
+        with self.mongo_db.watch(
+                pipeline,
+                full_document='updateLookup',
+                resume_after=self._get_meta().get('resume_token'),
+                max_await_time_ms=1000
+        ) as stream:
+            while stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    actions.extend(self._change_to_actions(change))
+                    # 没有可写入的变更时也要推进断点
+                    if not actions:
+                        self._save_meta({'resume_token': stream.resume_token})
+                if actions and (len(actions) >= flush_size or time.monotonic() - last_flush >= flush_interval):
+                    success, failed, errors = self._bulk(actions, chunk_size=flush_size)
+                    for error in errors[:20]:
+                        print(error)
+                    self._save_meta({'resume_token': stream.resume_token})
+                    changed = changed or success > 0
+                    print(f"同步变更：成功 {success} 条，失败 {failed} 条")
+                    actions = []
+                if not actions:
+                    last_flush = time.monotonic()
+                if changed and time.monotonic() - last_generation >= generation_interval:
+                    self.mark_index_rebuilt()
+                    changed, last_generation = False, time.monotonic()
+            if changed:
+                self.mark_index_rebuilt()
+
+    def _change_to_actions(self, change):
+        doc_id = str(change['documentKey']['_id'])
+        if change['operationType'] == 'delete':
+            return [{'_op_type': 'delete', '_index': self.index_name, '_id': doc_id}]
+        doc = change.get('fullDocument')
+        if doc is None:  # 更新之后又被删除了
+            return []
+        if change['ns']['coll'] == self.news_collection.name:
+            return [self._index_action(d) for d in self._build_news_documents([doc])]
+        return [self._index_action(self._build_file_document(doc))]
+
+    def _index_action(self, doc):
+        return {'_index': self.index_name, '_id': doc.pop('_id'), '_source': doc}
+
+    def finish_bulk_load(self, max_num_segments=3, health_timeout='10m'):
+        """恢复副本数和刷新间隔，合并段并等待集群变绿
+
+        副本数不超过数据节点数减一，否则多出的副本无法分配，索引永远不会变绿（如单节点集群）。
+        """
+        data_nodes = self.es.cluster.health().get('number_of_data_nodes', 1)
+        replicas = max(0, min(self.number_of_replicas, data_nodes - 1))
+        if replicas < self.number_of_replicas:
+            print(f"集群只有 {data_nodes} 个数据节点，副本数设为 {replicas}")
+        self.es.indices.put_settings(
+            index=self.index_name,
+            body={
+                "index": {
+                    "number_of_replicas": replicas,
+                    "refresh_interval": self.refresh_interval
+                }
+            }
+        )
+        self.es.indices.refresh(index=self.index_name)
+        # 段合并耗时较长，单独放宽超时
+        self.es.options(request_timeout=3600).indices.forcemerge(
+            index=self.index_name,
+            max_num_segments=max_num_segments
+        )
+        health = self.es.options(request_timeout=3600).cluster.health(
+            index=self.index_name,
+            wait_for_status='green',
+            timeout=health_timeout
+        )
+        if health.get('timed_out'):
+            print(f"等待索引变绿超时，当前状态：{health.get('status')}")
+        return health.get('status')
+
+    def warm_index(self, top_queries=20):
+        """切换前用历史热门查询预热新索引"""
+        self.es.search(index=self.index_name, body={"query": {"match_all": {}}, "size": 0})
+        history = self.mongo_db['search_history'].aggregate([
+            {"$group": {"_id": "$query", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": top_queries}
+        ])
+        for item in history:
+            if not item['_id']:
+                continue
+            self.es.search(index=self.index_name, body={
+                "query": {"multi_match": {"query": item['_id'], "fields": ["title^2.0", "content^1.0"]}},
+                "size": 10
+            })
+
+    def check_build(self, failed, max_failed=0, min_ratio=0.9):
+        """切换别名前检查新版本：写入失败超过 max_failed 条，或文档数少于线上版本的 min_ratio 倍时抛出异常"""
+        if failed > max_failed:
+            raise RuntimeError(f"{failed} 条文档写入失败，超过允许的 {max_failed} 条，不切换别名")
+        new_count = self.es.count(index=self.index_name)['count']
+        if self.es.indices.exists(index=self.alias_name):
+            live_count = self.es.count(index=self.alias_name)['count']
+            if new_count < live_count * min_ratio:
+                raise RuntimeError(f"新索引只有 {new_count} 条文档，线上版本有 {live_count} 条，不切换别名")
+        return new_count
+
+    def list_versions(self):
+        """按时间从新到旧列出所有版本索引"""
+        versions = self.es.indices.get(index=f"{self.alias_name}_v*", expand_wildcards='open')
+        return sorted(versions.keys(), reverse=True)
+
+    def swap_alias(self, index_name=None, keep_versions=3):
+        """把别名原子地切到 index_name（默认为刚建好的版本），只保留最近 keep_versions 个版本用于回滚"""
+        index_name = index_name or self.index_name
+        actions = [{"add": {"index": index_name, "alias": self.alias_name}}]
+        if self.es.indices.exists_alias(name=self.alias_name):
+            for old_index in self.es.indices.get_alias(name=self.alias_name):
+                if old_index != index_name:
+                    actions.append({"remove": {"index": old_index, "alias": self.alias_name}})
+        elif self.es.indices.exists(index=self.alias_name):
+            # 旧部署直接使用了同名索引，在同一个原子操作中删除它
+            actions.append({"remove_index": {"index": self.alias_name}})
+        self.es.indices.update_aliases(body={"actions": actions})
+        self.index_name = index_name
+
+        if keep_versions:
+            for old_index in self.list_versions()[keep_versions:]:
+                if old_index != index_name:
+                    self.es.indices.delete(index=old_index)
+
+    def rollback(self):
+        """别名切回当前版本之前的一个版本"""
+        if not self.es.indices.exists_alias(name=self.alias_name):
+            # 新集群还没有建过索引，或旧部署直接使用了同名索引
+            print(f"别名 {self.alias_name} 不存在，请先不带参数运行一次 index.py 完成全量构建")
+            return None
+        current = list(self.es.indices.get_alias(name=self.alias_name))
+        older = [name for name in self.list_versions() if name < current[0]]
+        if not older:
+            print("没有可回滚的旧版本索引")
+            return None
+        self.swap_alias(older[0], keep_versions=0)
+        self.mark_index_rebuilt()
+        return older[0]
+
+    def discard_index(self):
+        """删除未完成构建的版本索引，已经上线的版本不会被删除"""
+        if self.index_name == self.alias_name or not self.es.indices.exists(index=self.index_name):
+            return
+        if self.es.indices.exists_alias(name=self.alias_name, index=self.index_name):
+            return
+        self.es.indices.delete(index=self.index_name)
+
+    def write_title_index(self, path=TITLE_INDEX_PATH):
+        """全量构建完成后从新索引中读出所有标题及补全权重，写成Web服务使用的本地前缀索引，返回标题数
+
+        文件中记录当前的索引版本，之后增量同步更新了版本，Web服务就不再使用这个文件，改为查询ES。
+        """
+        title_weights = {}
+        for hit in scan(self.es, index=self.index_name, query={"_source": ["title", "suggest.weight"]}, size=2000):
+            source = hit['_source']
+            title = source.get('title')
+            if title:
+                weight = source.get('suggest', {}).get('weight', 1)
+                title_weights[title] = max(weight, title_weights.get(title, 0))
+        return write_title_index(path, title_weights, generation=self._get_meta().get('generation'))
+
+    def mark_index_rebuilt(self):
+        """记录索引版本（重建或增量同步后），Web端的搜索结果缓存据此失效"""
+        self._save_meta({'generation': f"{self.index_name}@{datetime.now().strftime('%Y%m%d%H%M%S%f')}"})
+
+    def save_watermark(self, synced_at):
+        """记录同步水位，synced_at 之前的变更都已写入索引
+
+        爬虫在批量提交之前就写好了 created_at，时间戳早于 synced_at 的文档可能在本次查询之后才提交，
+        所以水位往前留出 WATERMARK_LAG，下次同步重新检查这段时间的文档（重复写入ES不影响结果）。
+        """
+        self._save_meta({'synced_at': synced_at - self.WATERMARK_LAG})
+
+    def _get_meta(self):
+        return self.mongo_db['index_meta'].find_one({'_id': self.alias_name}) or {}
+
+    def _save_meta(self, fields):
+        self.mongo_db['index_meta'].update_one({'_id': self.alias_name}, {'$set': fields}, upsert=True)
 
     def close(self):
         """关闭数据库连接"""
-        self.mongo_client.close()
+        close_connections()
 
 
 def main():
-    indexer = NewsIndexer(
-        mongo_host='localhost',
-        mongo_port=27017,
-        mongo_db='nku_news',
-        es_host='localhost',
-        es_port=9200,
-        index_name='nankai_news_index'
-    )
+    parser = argparse.ArgumentParser(description="构建南开新闻搜索索引")
+    parser.add_argument('--rollback', action='store_true', help="把别名切回上一个版本索引")
+    parser.add_argument('--incremental', action='store_true', help="只同步上次同步之后变化的文档")
+    parser.add_argument('--watch', action='store_true', help="监听MongoDB变更流持续同步")
+    args = parser.parse_args()
+
+    indexer = NewsIndexer(index_name='nankai_news_index')
     try:
+        if args.rollback:
+            previous = indexer.rollback()
+            if previous:
+                print(f"已回滚到：{previous}")
+            return
+        if args.incremental:
+            success, failed, errors = indexer.sync_incremental()
+            print(f"增量同步完成，成功：{success} 条，失败：{failed} 条")
+            for error in errors[:20]:
+                print(error)
+            return
+        if args.watch:
+            print("开始监听变更...")
+            indexer.watch_changes()
+            return
+
+        build_started = datetime.now()
         print("开始创建索引...")
         indexer.create_index()
-        print("索引结构创建完成")
-
-        print("开始准备文档...")
-        documents = indexer.prepare_documents()
-        print(f"文档准备完成，共 {len(documents)} 条记录")
+        print(f"索引结构创建完成：{indexer.index_name}")
 
         print("开始批量索引文档...")
         try:
-            from elasticsearch.helpers import BulkIndexError
-            success, failed = bulk(
-                indexer.es,
-                [
-                    {
-                        '_index': indexer.index_name,
-                        '_id': doc['_id'],
-                        **doc
-                    }
-                    for doc in documents
-                ],
-                chunk_size=500,
-                request_timeout=300,
-                refresh=True
+            success, failed, errors = indexer.index_documents(
+                thread_count=int(os.environ.get('INDEX_THREADS', 4)),
+                chunk_size=int(os.environ.get('INDEX_CHUNK_SIZE', 500)),
+                max_chunk_bytes=int(os.environ.get('INDEX_CHUNK_BYTES', 10 * 1024 * 1024))
             )
             print(f"文档索引完成，成功：{success} 条，失败：{failed} 条")
-        except BulkIndexError as e:
-            print(f"批量索引过程中发生错误0: {str(e)}")
-            for error in e.errors:
+            for error in errors[:20]:
                 print(error)
+
+            print("恢复副本与刷新设置，合并索引段...")
+            status = indexer.finish_bulk_load()
+            print(f"索引状态：{status}")
+
+            indexer.check_build(
+                failed,
+                max_failed=int(os.environ.get('INDEX_MAX_FAILED', 0)),
+                # 去重脚本删除文档后重建的索引会比线上版本少，留出一定余量
+                min_ratio=float(os.environ.get('INDEX_MIN_RATIO', 0.9))
+            )
+
+            print("预热新索引并切换别名...")
+            indexer.warm_index()
+            indexer.swap_alias()
+            indexer.save_watermark(build_started)
+            indexer.mark_index_rebuilt()
+            print(f"别名 {indexer.alias_name} 已指向 {indexer.index_name}")
+
+            count = indexer.write_title_index()
+            print(f"标题补全索引已生成：{count} 条")
         except Exception as e:
             print(f"批量索引过程中发生错误: {str(e)}")
             import traceback
             print(traceback.format_exc())
+            indexer.discard_index()
     finally:
         indexer.close()
 
@@ -1,13 +1,63 @@
-from elasticsearch import Elasticsearch
+from common.connections import get_es
+
+
+class SearchHit:
+    """精简的搜索结果记录，只保留结果页需要渲染的字段"""
+    __slots__ = ('id', 'score', 'title', 'snippet', 'url', 'source', 'date', 'snapshot_hash',
+                 'captured_at', 'filetype', 'filename', 'upload_date')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
 
 class NormalSearch:
-    def __init__(self, es_host='localhost', es_port=9200, index_name='nankai_news_index'):
-        self.es = Elasticsearch([f'http://{es_host}:{es_port}'], basic_auth=('elastic', 'ZCjtuz7ZKNWy7u5DaOId'))
+    def __init__(self, es=None, index_name='nankai_news_index'):
+        self.es = es or get_es()
         self.index_name = index_name
         self.SUPPORTED_FILETYPES = ['pdf', 'doc', 'docx', 'xls', 'xlsx']
 
-    def execute_search(self, search_type, query_text, search_in='all', sort_by='relevance', filetypes=None, size=2000):
+    # 结果页用到的字段，content 只通过高亮片段返回
+    SOURCE_FIELDS = ['title', 'url', 'source', 'date', 'snapshot_hash', 'captured_at',
+                     'filetype', 'filename', 'upload_date']
+    # 摘要片段长度与结果页展示的长度一致
+    SNIPPET_SIZE = 200
+
+    # ES默认的 index.max_result_window，from+size 超过该值时改用 search_after 翻页
+    MAX_RESULT_WINDOW = 10000
+
+    def search_page(self, search_type, query_text, search_in='all', sort_by='relevance', filetypes=None,
+                    page=1, page_size=10, search_after=None, personal_search=None):
+        """分页查询：只向ES请求当前页的结果，总数取自 hits.total
+
+        返回 {'results': 当前页结果, 'total': 命中总数, 'search_after': 最后一条结果的排序值}，
+        调用方可以把 search_after 传回来直接获取下一页，避免深分页时重复跳过前面的结果。
+        传入 personal_search（PersonalSearch）时按用户画像在ES中重新打分。
+        """
         field_config = self._get_field_config(search_in)
+        body = self._build_search_body(search_type, query_text, field_config, sort_by, filetypes, personal_search)
+        body['size'] = page_size
+        body['track_total_hits'] = True
+
+        offset = (max(page, 1) - 1) * page_size
+        if search_after is None and offset + page_size > self.MAX_RESULT_WINDOW:
+            # 深分页：from/size 超出窗口，先用 search_after 定位到 offset 处
+            search_after = self._seek(body, offset)
+        if search_after is not None:
+            body['search_after'] = search_after
+        else:
+            body['from'] = offset
+
+        res = self.es.search(index=self.index_name, body=body)
+        hits = res['hits']['hits']
+        total = res['hits']['total']
+        return {
+            'results': [self._process_hit(hit) for hit in hits],
+            'total': total['value'] if isinstance(total, dict) else total,
+            'search_after': hits[-1].get('sort') if hits else None
+        }
+
+    def _build_search_body(self, search_type, query_text, field_config, sort_by, filetypes, personal_search=None):
         if search_type == 'document':
             body = self._build_document_query(query_text, field_config, filetypes)
         elif search_type == 'phrase':
@@ -16,32 +66,68 @@ class NormalSearch:
             body = self._build_wildcard_query(query_text, field_config)
         else:  # basic
             body = self._build_basic_query(query_text, field_config)
+        if personal_search is not None:
+            body['query'] = personal_search.wrap_query(body['query'])
 
-        # 添加高亮配置
+        # 只取结果页需要的字段，正文摘要取自高亮片段
+        body['_source'] = {"includes": self.SOURCE_FIELDS}
         body['highlight'] = {
             "pre_tags": ["<mark>"],
             "post_tags": ["</mark>"],
-            "fields": {field: {} for field in field_config["fields"]}
+            "fields": {
+                "title": {"number_of_fragments": 0},
+                "content": {
+                    "fragment_size": self.SNIPPET_SIZE,
+                    "number_of_fragments": 1,
+                    "no_match_size": self.SNIPPET_SIZE
+                }
+            }
         }
 
+        # 每一页都用同一个唯一确定的排序，from 翻页和 search_after 翻页的结果顺序一致
+        body['sort'] = self._get_stable_sort(sort_by)
+        return body
+
+    def _get_stable_sort(self, sort_by):
+        """分页需要唯一确定的排序，得分或日期相同时用 url 作为最后的比较字段"""
         if sort_by == 'date':
-            body['sort'] = [{"date": {"order": "desc"}}]
+            return [{"date": {"order": "desc"}}, {"url": {"order": "asc"}}]
+        return [{"_score": {"order": "desc"}}, {"url": {"order": "asc"}}]
 
-        # 关键：设置返回结果数量
-        body['size'] = size
+    def _seek(self, body, offset):
+        """只取排序值，逐批跳过前 offset 条结果，返回第 offset 条之前的 search_after"""
+        seek_body = {key: value for key, value in body.items() if key != 'highlight'}
+        seek_body['_source'] = False
+        seek_body['track_total_hits'] = False
+        search_after = None
+        while offset > 0:
+            seek_body['size'] = min(offset, self.MAX_RESULT_WINDOW)
+            if search_after is not None:
+                seek_body['search_after'] = search_after
+            hits = self.es.search(index=self.index_name, body=seek_body)['hits']['hits']
+            if not hits:
+                break
+            search_after = hits[-1]['sort']
+            offset -= len(hits)
+        return search_after
 
-        res = self.es.search(index=self.index_name, body=body)
-        results = []
-        for hit in res['hits']['hits']:
-            source = hit['_source']
-            highlight = hit.get('highlight', {})
-            for field in field_config["fields"]:
-                if field in highlight:
-                    source[field + '_highlight'] = highlight[field][0]
-                else:
-                    source[field + '_highlight'] = source.get(field, '')
-            results.append(source)
-        return results
+    def _process_hit(self, hit):
+        source = hit['_source']
+        highlight = hit.get('highlight', {})
+        return SearchHit(
+            id=hit.get('_id'),
+            score=hit.get('_score') or 0.0,
+            title=highlight['title'][0] if 'title' in highlight else source.get('title', ''),
+            snippet=highlight['content'][0] if 'content' in highlight else '',
+            url=source.get('url'),
+            source=source.get('source', ''),
+            date=source.get('date', ''),
+            snapshot_hash=source.get('snapshot_hash'),
+            captured_at=source.get('captured_at'),
+            filetype=source.get('filetype'),
+            filename=source.get('filename'),
+            upload_date=source.get('upload_date')
+        )
 
     def _get_field_config(self, search_in='all'):
         if search_in == 'title':
@@ -4,9 +4,8 @@ class PagePartition:
     def __init__(self, results_per_page=10):
         self.RESULTS_PER_PAGE = results_per_page
        
-    def process_results(self, results, page=1):
-        """处理搜索结果并应用分页"""
-        total_results = len(results)
+    def process_page(self, page_results, total_results, page=1):
+        """处理ES已经分好页的结果，page_results 只包含当前页"""
         total_pages = math.ceil(total_results / self.RESULTS_PER_PAGE)
 
         # 计算分页
@@ -15,11 +14,6 @@ class PagePartition:
         if end_page - start_page < 9:
             start_page = max(1, end_page - 9)
 
-        # 获取当前页的结果
-        start_idx = (page - 1) * self.RESULTS_PER_PAGE
-        end_idx = start_idx + self.RESULTS_PER_PAGE
-        page_results = results[start_idx:end_idx]
-
         # 处理结果
         processed_results = [self._process_single_result(hit) for hit in page_results]
 
@@ -31,15 +25,15 @@ class PagePartition:
         }
 
     def _process_single_result(self, hit):
-        """处理单个搜索结果，兼容ES高亮"""
+        """处理单个搜索结果（SearchHit），标题和摘要已是ES高亮片段"""
         # 文档类型处理
-        if hit.get('filetype'):
+        if hit.filetype:
             return {
-                'title': hit.get('title_highlight') or hit.get('title', '无标题'),
-                'filename': hit.get('filename', '未知文件名'),
-                'filetype': hit.get('filetype', '未知类型'),
-                'upload_date': hit.get('upload_date', None),
-                'url': hit.get('url', '#'),
+                'title': hit.title or '无标题',
+                'filename': hit.filename or '未知文件名',
+                'filetype': hit.filetype,
+                'upload_date': hit.upload_date,
+                'url': hit.url or '#',
                 'snippet': None,
                 'source': '',
                 'date': '',
@@ -49,18 +43,11 @@ class PagePartition:
             }
 
         # 普通新闻/网页类型
-        title = hit.get('title_highlight') or hit.get('title', '无标题')
-        content = hit.get('content_highlight') or hit.get('content', '')
-        snippet = content[:200] if content else hit.get('content', '')[:200]
-
-        # 来源、日期等
-        source = hit.get('source', '')
-        date_str = hit.get('date', '') or hit.get('publish_date', '')
+        date_str = hit.date or ''
         sort_date = self._process_date(date_str)
 
         # 快照信息
-        snapshot_hash = hit.get('snapshot_hash')
-        captured_at = hit.get('captured_at')
+        captured_at = hit.captured_at
         snapshot_date = None
         if captured_at:
             try:
@@ -73,15 +60,15 @@ class PagePartition:
                 snapshot_date = None
 
         return {
-            'title': title,
-            'url': hit.get('url', '#'),
-            'snippet': snippet,
-            'source': source,
+            'title': hit.title or '无标题',
+            'url': hit.url or '#',
+            'snippet': hit.snippet,
+            'source': hit.source or '',
             'date': date_str,
             'sort_date': sort_date,
-            'filetype': hit.get('filetype', None),
-            'filename': hit.get('filename', None),
-            'snapshot_hash': snapshot_hash,
+            'filetype': None,
+            'filename': hit.filename,
+            'snapshot_hash': hit.snapshot_hash,
             'snapshot_date': snapshot_date
         }
 
@@ -1,3 +1,51 @@
+import re
+from functools import lru_cache
+
+# ES中的个性化打分脚本，按文档的 persona_terms 计算权重提升 boost，最终得分为 boost * (1 + 0.019 * BM25得分)：
+#   角色规则命中时乘以对应系数；学院全称 +40%，否则学院变体 +30%，都未命中时按学院关键词 +10%，每个再 +5%（最多 +40%）；
+#   相关学院 +15%；活动类内容在本院匹配时 +25%，仅相关学院匹配时 +10%
+PERSONA_SCRIPT = """
+double boost = 1.0;
+if (doc.containsKey('persona_terms')) {
+    Set found = new HashSet(doc['persona_terms']);
+    for (def rule : params.role_rules) {
+        for (def tag : rule.tags) {
+            if (found.contains(tag)) { boost *= rule.factor; break; }
+        }
+    }
+    if (params.college != null) {
+        boolean collegeMatched = false;
+        if (found.contains(params.college)) {
+            boost *= 1.4;
+            collegeMatched = true;
+        } else {
+            for (def variation : params.variations) {
+                if (found.contains(variation)) { boost *= 1.3; collegeMatched = true; break; }
+            }
+        }
+        if (!collegeMatched) {
+            int matched = 0;
+            for (def entry : params.keyword_counts.entrySet()) {
+                if (found.contains(entry.getKey())) { matched += entry.getValue(); }
+            }
+            if (matched > 0) { boost *= 1.1 + Math.min(matched * 0.05, 0.3); }
+        }
+        boolean relatedMatched = false;
+        for (def related : params.related) {
+            if (found.contains(related)) { relatedMatched = true; break; }
+        }
+        if (relatedMatched) { boost *= 1.15; }
+        for (def activity : params.activity) {
+            if (found.contains(activity)) {
+                if (collegeMatched) { boost *= 1.25; } else if (relatedMatched) { boost *= 1.1; }
+                break;
+            }
+        }
+    }
+}
+return boost * (1 + 0.019 * _score);
+"""
+
 class PersonalSearch:
     """搜索结果个性化处理类"""
 
@@ -18,245 +66,253 @@ class PersonalSearch:
         '周恩来政府管理学院': ['法学院', '马克思主义学院', '历史学院']
     }
 
+    # 学院名称的变体形式（文档中出现即视为本院内容）
+    COLLEGE_VARIATIONS = {
+        '计算机与网络空间安全学院': ['计算机学院', '网安学院', '计算机与网安学院', '网络空间安全学院'],
+        '文学院': ['文学院', '中文系', '汉语言'],
+        '商学院': ['商学院', 'MBA', '工商管理'],
+        '医学院': ['医学院', '附属医院', '临床医学'],
+        '生命科学学院': ['生科院', '生命学院', '生物学院'],
+        '物理科学学院': ['物理学院', '物理系'],
+        '化学学院': ['化学院', '化学系'],
+        '数学科学学院': ['数学院', '数学系'],
+        '经济学院': ['经济系', '经济管理']
+    }
+
+    # 相关学院的其他叫法，与 COLLEGE_RELATIONS 合并使用
+    RELATED_COLLEGE_VARIANTS = {
+        '计算机与网络空间安全学院': ['计算机学院', '网络空间安全学院', '信息科学学院'],
+        '计算机学院': ['计算机与网络空间安全学院', '软件学院', '信息科学学院'],
+        '文学院': ['新闻学院', '外国语学院', '汉语言文化学院'],
+        '物理科学学院': ['物理学院', '光学工程学院'],
+        '化学学院': ['化学系', '材料学院'],
+        '医学院': ['生命科学院', '药学院'],
+        '商学院': ['经济学院', '管理学院']
+    }
+
+    # 学院相关的上下文关键词
+    COLLEGE_KEYWORDS = {
+        '计算机与网络空间安全学院': [
+        '编程', '算法', '软件', '人工智能', '网络',
+        '网络安全', '信息安全', '密码学', '渗透测试',
+        '实验室', '机房', '创新实践基地',
+        '程序设计大赛', '编程竞赛', 'ACM', '网络安全竞赛',
+        '计算机科学', '软件工程', '网络工程', '信息安全',
+        ],
+        '文学院': [
+        '文学', '写作', '语言', '文化', '古籍',
+        '图书馆', '文学社', '创作室',
+        '诗歌朗诵', '读书会', '文学讲座', '创作比赛',
+        '中国语言文学', '汉语言', '文艺学', '比较文学'
+        ],
+        '物理科学学院': [
+        '物理', '光学', '量子', '实验室', '力学',
+        '电磁学', '热学', '光电', '激光'
+        ],
+        '化学学院': [
+        '化学', '分子', '实验', '材料', '有机化学',
+        '无机化学', '分析化学', '物理化学'
+        ],
+        '经济学院': [
+        '经济', '金融', '贸易', '市场', '投资',
+        '统计', '财务', '商业', '管理'
+        ],
+        '医学院': [
+        '医学', '临床', '病理', '解剖', '生理',
+        '药理', '诊断', '治疗', '护理'
+        ],
+        '生命科学学院': [
+        '生物', '生态', '遗传', '细胞', '分子生物学',
+        '生物技术', '生物信息学', '环境科学'
+        ],
+        '商学院': [
+        '管理', '市场营销', '会计', '财务', '人力资源',
+        '工商管理', 'MBA', '创业', '企业管理', '经济学'
+        ],
+        '历史学院': [
+        '历史', '考古', '文物', '史学', '中国史',
+        '世界史', '历史研究', '历史讲座', '史料'
+        ],
+        '外国语学院': [
+        '英语', '翻译', '外语', '日语', '法语',
+        '德语', '语言学', '外语教学', '口译', '笔译'
+        ],
+        '数学科学学院': [
+        '数学', '统计', '概率', '运筹学', '数学建模',
+        '数据分析', '应用数学', '纯数学', '数理逻辑'
+        ],
+    }
+
+    # 所有学院通用的关键词
+    BASE_KEYWORDS = ['科研', '实验室', '研究', '项目', '讲座', '活动']
+
+    # 各角色关注的内容：[(关键词, 提升倍数)]，命中任意一个关键词即提升
+    STUDENT_RULES = [
+        (['学生', '教务', '活动', '奖学金'], 1.2),
+        (['就业', '实习', '竞赛', '夜跑', '社团', '活动'], 1.15),
+    ]
+    ROLE_RULES = {
+        '教师': [
+            (['学术', '科研', '教学', '实验室', '课题'], 1.3),
+            (['教务', '师资', '课程'], 1.2),
+        ],
+        '本科生': STUDENT_RULES,
+        '研究生': STUDENT_RULES,
+        '博士生': STUDENT_RULES,
+    }
+
+    # 活动类内容，与学院匹配组合加分
+    ACTIVITY_KEYWORDS = ['活动', '比赛', '夜跑', '讲座', '社团']
+
     def __init__(self, user_profile=None):
         self.user_profile = user_profile
 
-    def personalize_results(self, results, sort_by='relevance'):
+    def cohort(self):
+        """个性化得分只取决于角色和学院，同一 (角色, 学院) 的用户结果相同，可作为缓存键的一部分
+
+        没有画像时返回空元组，结果与普通查询相同。
+        """
         if not self.user_profile:
-            return results  
-
-        # 获取用户角色和学院信息
-        role = self.user_profile.get('role', '未设置')
-        college = self.user_profile.get('college', '未设置')
-        # 获取相关学院列表
-        related_colleges = self._get_related_colleges(college)
-
-        # 将所有结果转换为(得分,hit)元组列表
-        result_list = []
-        for hit in results:
-            try:
-                # 获取或设置基础得分
-                base_score = hit.score if hasattr(hit, 'score') else 1.0
-
-                # 安全地获取文档内容
-                content = ''
-                # 尝试从不同可能的字段获取内容
-                content_fields = ['title', 'content', 'text']
-                for field in content_fields:
-                    if hasattr(hit, field):
-                        content += str(getattr(hit, field, '')) + ' '
-                    elif hasattr(hit, 'get'):
-                        content += str(hit.get(field, '')) + ' '
-                content = content.lower()
-
-                # 计算boost因子
-                boost = self._calculate_boost(content, role, college, related_colleges)
-
-                # 计算最终得分
-                final_score = boost*(1+0.019*base_score)
-                # 存储元组: (最终得分, 时间戳或默认值, 原始对象)
-                timestamp = None
-                if hasattr(hit, 'publish_date'):
-                    timestamp = getattr(hit, 'publish_date')
-                elif hasattr(hit, 'get'):
-                    timestamp = hit.get('publish_date')
-
-                result_list.append((final_score, timestamp, hit))
-
-            except Exception as e:
-                print(f"处理结果时出错: {str(e)}")
-                result_list.append((base_score, None, hit))
-
-        # 根据排序方式排序
-        if sort_by == 'time':
-            # 先按时间排序，时间相同的按分数排序
-            sorted_results = sorted(
-                result_list,
-                key=lambda x: (x[1] or '', -x[0]),  # 使用空字符串作为默认时间戳
-                reverse=True
-            )
-        else:
-            # 按分数排序
-            sorted_results = sorted(
-                result_list,
-                key=lambda x: x[0],  # 使用最终得分排序
-                reverse=True
-            )
-
-        # 只返回原始对象列表
-        return [item[2] for item in sorted_results]
-
-    def _calculate_boost(self, content, role, college, related_colleges):
-        """计算搜索结果的权重提升"""
-        boost = 1.0
-        boost_reasons = []  # 用于记录加分原因
-
-        # 1. 基于角色的内容提升
-        if role == '教师':
-            if any(tag in content.lower() for tag in ['学术', '科研', '教学', '实验室', '课题']):
-                boost *= 1.3
-                boost_reasons.append("教师-学术内容匹配: +30%")
-            if any(tag in content.lower() for tag in ['教务', '师资', '课程']):
-                boost *= 1.2
-                boost_reasons.append("教师-教务内容匹配: +20%")
-        elif role in ['本科生', '研究生', '博士生']:
-            if any(tag in content.lower() for tag in ['学生', '教务', '活动', '奖学金']):
-                boost *= 1.2
-                boost_reasons.append("学生相关内容匹配: +20%")
-            if any(tag in content.lower() for tag in ['就业', '实习', '竞赛', '夜跑', '社团', '活动']):
-                boost *= 1.15
-                boost_reasons.append("学生活动内容匹配: +15%")
-
-        # 2. 学院相关性判断
-        if college != '未设置':
-            # 规范化处理内容和学院名称
-            normalized_content = content.lower()
-            normalized_college = college.lower()
-
-            # 检查文档中是否包含学院名称（包括变体形式）
-            college_variations = {
-                '计算机与网络空间安全学院': ['计算机学院', '网安学院', '计算机与网安学院', '网络空间安全学院'],
-                '文学院': ['文学院', '中文系', '汉语言'],
-                '商学院': ['商学院', 'MBA', '工商管理'],
-                '医学院': ['医学院', '附属医院', '临床医学'],
-                '生命科学学院': ['生科院', '生命学院', '生物学院'],
-                '物理科学学院': ['物理学院', '物理系'],
-                '化学学院': ['化学院', '化学系'],
-                '数学科学学院': ['数学院', '数学系'],
-                '经济学院': ['经济系', '经济管理']
+            return ()
+        return ('personal', self.user_profile.get('role', '未设置'), self.user_profile.get('college', '未设置'))
+
+    def wrap_query(self, query):
+        """把个性化规则包装成ES的 function_score 查询，用 PERSONA_SCRIPT 计算得分
+
+        文档出现了哪些规则关键词在索引时已写入 persona_terms 字段，打分脚本只需按用户的
+        角色和学院检查这些关键词，所以个性化查询也可以像普通查询一样在ES中分页，并使用真实的BM25得分。
+        """
+        if not self.user_profile:
+            return query
+        rules = _compile_rules(self.user_profile.get('role', '未设置'), self.user_profile.get('college', '未设置'))
+        return {
+            "function_score": {
+                "query": query,
+                "functions": [{
+                    "script_score": {
+                        "script": {"source": PERSONA_SCRIPT, "params": rules.script_params()}
+                    }
+                }],
+                "boost_mode": "replace"
             }
+        }
 
-            college_matched = False
-            # 检查完整学院名称
-            if college.lower() in normalized_content:
-                boost *= 1.4
-                college_matched = True
-                boost_reasons.append(f"完整学院名称匹配({college}): +40%")
-
-            # 检查学院变体
-            if not college_matched:
-                variations = college_variations.get(college, [])
-                for variation in variations:
-                    if variation.lower() in normalized_content:
-                        boost *= 1.3
-                        college_matched = True
-                        boost_reasons.append(f"学院变体名称匹配({variation}): +30%")
-                        break
-
-            # 检查学院关键词
-            if not college_matched:
-                keywords = self._get_college_context_keywords(college)
-                matched_keywords = [kw for kw in keywords if kw.lower() in normalized_content]
-                if matched_keywords:
-                    keyword_boost = 1.1 + min(len(matched_keywords) * 0.05, 0.3)
-                    boost *= keyword_boost
-                    boost_reasons.append(
-                        f"学院关键词匹配({', '.join(matched_keywords)}): +{(keyword_boost - 1) * 100:.0f}%")
-
-            # 检查相关学院
-            for related_college in related_colleges:
-                if related_college.lower() in normalized_content:
-                    boost *= 1.15
-                    boost_reasons.append(f"相关学院匹配({related_college}): +15%")
-                    break
-
-            # 检查活动类型和学院组合
-            activity_keywords = ['活动', '比赛', '夜跑', '讲座', '社团']
-            if any(kw in normalized_content for kw in activity_keywords):
-                if college_matched:
-                    boost *= 1.25
-                    boost_reasons.append("本院活动加分: +25%")
-                elif any(related in normalized_content for related in related_colleges):
-                    boost *= 1.1
-                    boost_reasons.append("相关学院活动加分: +10%")
-        return boost
-
-    def _get_related_colleges(self, college):
+    @staticmethod
+    def extract_terms(text):
+        """文本中出现的所有个性化规则关键词，索引时写入 persona_terms 字段"""
+        return sorted(_all_terms_scanner().scan(text.lower()))
+
+    @classmethod
+    def _get_related_colleges(cls, college):
         """获取与用户学院相关的其他学院列表"""
         if college == '未设置':
             return []
+        # 合并基础相关学院和变体形式，去重
+        related = cls.COLLEGE_RELATIONS.get(college, [])
+        variants = cls.RELATED_COLLEGE_VARIANTS.get(college, [])
+        return list(set(related + variants))
 
-        # 处理学院名称的不同形式
-        college_variants = {
-            '计算机与网络空间安全学院': ['计算机学院', '网络空间安全学院', '信息科学学院'],
-            '计算机学院': ['计算机与网络空间安全学院', '软件学院', '信息科学学院'],
-            '文学院': ['新闻学院', '外国语学院', '汉语言文化学院'],
-            '物理科学学院': ['物理学院', '光学工程学院'],
-            '化学学院': ['化学系', '材料学院'],
-            '医学院': ['生命科学院', '药学院'],
-            '商学院': ['经济学院', '管理学院']
-        }
+    @classmethod
+    def _get_college_context_keywords(cls, college):
+        """获取学院相关的上下文关键词（特定关键词加通用关键词）"""
+        return cls.COLLEGE_KEYWORDS.get(college, []) + cls.BASE_KEYWORDS
+
+
+class _TermScanner:
+    """把一组关键词合并成一个正则，一次扫描找出文本中出现的全部关键词
+
+    正则用零宽前瞻在每个位置取最长的关键词，较短的关键词若是它的前缀也一并记为出现，
+    所以互相重叠的关键词也都能找到。关键词按前缀树展开成嵌套分支，并先用首字符集合过滤，
+    不可能匹配的位置不会逐个尝试关键词。
+    """
 
-        # 获取基础相关学院
-        related = self.COLLEGE_RELATIONS.get(college, [])
-
-        # 添加变体形式
-        variants = college_variants.get(college, [])
-
-        # 合并所有相关学院，去重
-        all_related = list(set(related + variants))
-
-        return all_related
-
-    def _get_college_context_keywords(self, college):
-        """获取学院相关的上下文关键词"""
-        COLLEGE_KEYWORDS = {
-            '计算机与网络空间安全学院': [
-            '编程', '算法', '软件', '人工智能', '网络',
-            '网络安全', '信息安全', '密码学', '渗透测试',
-            '实验室', '机房', '创新实践基地',
-            '程序设计大赛', '编程竞赛', 'ACM', '网络安全竞赛',
-            '计算机科学', '软件工程', '网络工程', '信息安全',
-            ],
-            '文学院': [
-            '文学', '写作', '语言', '文化', '古籍',
-            '图书馆', '文学社', '创作室',
-            '诗歌朗诵', '读书会', '文学讲座', '创作比赛',
-            '中国语言文学', '汉语言', '文艺学', '比较文学'
-            ],
-            '物理科学学院': [
-            '物理', '光学', '量子', '实验室', '力学',
-            '电磁学', '热学', '光电', '激光'
-            ],
-            '化学学院': [
-            '化学', '分子', '实验', '材料', '有机化学',
-            '无机化学', '分析化学', '物理化学'
-            ],
-            '经济学院': [
-            '经济', '金融', '贸易', '市场', '投资',
-            '统计', '财务', '商业', '管理'
-            ],
-            '医学院': [
-            '医学', '临床', '病理', '解剖', '生理',
-            '药理', '诊断', '治疗', '护理'
-            ],
-            '生命科学学院': [
-            '生物', '生态', '遗传', '细胞', '分子生物学',
-            '生物技术', '生物信息学', '环境科学'
-            ],
-            '商学院': [
-            '管理', '市场营销', '会计', '财务', '人力资源',
-            '工商管理', 'MBA', '创业', '企业管理', '经济学'
-            ],
-            '历史学院': [
-            '历史', '考古', '文物', '史学', '中国史',
-            '世界史', '历史研究', '历史讲座', '史料'
-            ],
-            '外国语学院': [
-            '英语', '翻译', '外语', '日语', '法语',
-            '德语', '语言学', '外语教学', '口译', '笔译'
-            ],
-            '数学科学学院': [
-            '数学', '统计', '概率', '运筹学', '数学建模',
-            '数据分析', '应用数学', '纯数学', '数理逻辑'
-            ],
+    def __init__(self, terms):
+        terms = {term for term in terms if term}
+        # 每个关键词 -> 它本身以及作为它前缀的其他关键词
+        self.implied = {term: frozenset(t for t in terms if term.startswith(t)) for term in terms}
+        self.pattern = None
+        if terms:
+            first_chars = re.escape(''.join(sorted({term[0] for term in terms})))
+            self.pattern = re.compile(f'(?=[{first_chars}])(?=({_trie_regex(terms)}))')
+
+    def scan(self, content):
+        found = set()
+        if self.pattern is not None:
+            for term in set(self.pattern.findall(content)):
+                found |= self.implied[term]
+        return found
+
+
+class _PersonalRules:
+    """某个 (角色, 学院) 的全部加权规则，转换成 PERSONA_SCRIPT 的参数"""
+
+    def __init__(self, role, college):
+        self.role_rules = [
+            (frozenset(tag.lower() for tag in tags), factor)
+            for tags, factor in PersonalSearch.ROLE_RULES.get(role, [])
+        ]
+        self.college = None
+        self.variations = []
+        self.keyword_counts = {}
+        self.related = frozenset()
+        self.activity = frozenset()
+        if college != '未设置':
+            self.college = college.lower()
+            self.variations = [v.lower() for v in PersonalSearch.COLLEGE_VARIATIONS.get(college, [])]
+            # 同一关键词在列表中出现多次时按次数计
+            for keyword in PersonalSearch._get_college_context_keywords(college):
+                keyword = keyword.lower()
+                self.keyword_counts[keyword] = self.keyword_counts.get(keyword, 0) + 1
+            self.related = frozenset(c.lower() for c in PersonalSearch._get_related_colleges(college))
+            self.activity = frozenset(PersonalSearch.ACTIVITY_KEYWORDS)
+
+    def script_params(self):
+        """传给ES打分脚本 PERSONA_SCRIPT 的参数"""
+        return {
+            'role_rules': [{'tags': sorted(tags), 'factor': factor} for tags, factor in self.role_rules],
+            'college': self.college,
+            'variations': self.variations,
+            'keyword_counts': self.keyword_counts,
+            'related': sorted(self.related),
+            'activity': sorted(self.activity)
         }
 
-        # 通用关键词
-        base_keywords = ['科研', '实验室', '研究', '项目', '讲座', '活动']
 
-        # 获取特定学院的关键词，如果没有则使用空列表
-        college_specific = COLLEGE_KEYWORDS.get(college, [])
+def _trie_regex(terms):
+    """把关键词集合写成前缀树形式的正则，同一位置优先匹配最长的关键词"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}  # 关键词结束标记
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # 当前节点本身是关键词时后续部分可选，贪婪匹配保证先尝试更长的关键词
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+@lru_cache(maxsize=256)
+def _compile_rules(role, college):
+    return _PersonalRules(role, college)
+
 
-        # 合并特定关键词和通用关键词
-        return college_specific + base_keywords
\ No newline at end of file
+@lru_cache(maxsize=1)
+def _all_terms_scanner():
+    """所有角色和学院规则用到的关键词，索引时据此给文档打标签"""
+    terms = set(PersonalSearch.ACTIVITY_KEYWORDS) | set(PersonalSearch.BASE_KEYWORDS)
+    for rules in PersonalSearch.ROLE_RULES.values():
+        for tags, _ in rules:
+            terms.update(tags)
+    for table in (PersonalSearch.COLLEGE_RELATIONS, PersonalSearch.RELATED_COLLEGE_VARIANTS,
+                  PersonalSearch.COLLEGE_VARIATIONS, PersonalSearch.COLLEGE_KEYWORDS):
+        for college, values in table.items():
+            terms.add(college)
+            terms.update(values)
+    return _TermScanner(term.lower() for term in terms)
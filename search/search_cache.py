@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class SearchCache:
+    """进程内搜索结果缓存：按条目数和字节数做LRU淘汰，条目带TTL
+
+    generation_fn 返回当前索引的版本标记，版本变化（索引重建）时清空整个缓存，
+    为避免每次请求都去查版本，最多每 generation_check_interval 秒检查一次。
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=64 * 1024 * 1024, ttl=300,
+                 generation_fn=None, generation_check_interval=30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.generation_fn = generation_fn
+        self.generation_check_interval = generation_check_interval
+
+        self._entries = OrderedDict()  # key -> (过期时间, 字节数, 值)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked_at = 0
+
+        # 命中统计，用于评估缓存大小是否合适
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(mode, query, search_in, sort_by, filetypes, page, *extra):
+        """规范化查询参数作为缓存键"""
+        normalized_query = ' '.join(query.split())
+        normalized_filetypes = tuple(sorted({ft.lower() for ft in filetypes or []}))
+        return (mode, normalized_query, search_in, sort_by, normalized_filetypes, page) + extra
+
+    def generation(self):
+        """当前的索引版本标记，与缓存失效使用同一份检查结果"""
+        self._check_generation()
+        return self._generation
+
+    def get(self, key):
+        self._check_generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _check_generation(self):
+        if self.generation_fn is None:
+            return
+        now = time.monotonic()
+        if now - self._generation_checked_at < self.generation_check_interval:
+            return
+        self._generation_checked_at = now
+        try:
+            generation = self.generation_fn()
+        except Exception as e:
+            print("Cache generation check error:", e)
+            return
+        if generation != self._generation:
+            self._generation = generation
+            self.clear()
+
+
+def _estimate_size(value):
+    """粗略估计缓存值占用的字节数"""
+    if isinstance(value, str):
+        return 49 + len(value.encode('utf-8'))
+    if isinstance(value, bytes):
+        return 33 + len(value)
+    if isinstance(value, dict):
+        return 64 + sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return 56 + sum(_estimate_size(v) for v in value)
+    if hasattr(value, '__slots__'):
+        return 56 + sum(_estimate_size(getattr(value, name, None)) for name in value.__slots__)
+    return 32
@@ -0,0 +1,114 @@
+import threading
+from concurrent.futures import Future
+
+from common.connections import get_es
+from search.search_cache import SearchCache
+from search.title_index import normalize as _normalize
+
+
+class TitleSuggester:
+    """标题补全：ES completion suggester 外加前缀缓存
+
+    每次向ES多取 fetch_size 条候选。返回的候选少于 fetch_size 时说明该前缀的全部候选都已拿到，
+    更长的前缀（继续输入）直接在本地过滤这份结果，不再请求ES。
+    多个请求同时查询同一个未缓存的前缀时只发一次ES请求，其余请求等待它的结果。
+    提供 local_index（TitleIndex）时先在本地前缀索引中查找，没有结果再走上面的流程。本地索引只在全量构建时生成，
+    增量同步更新了索引版本后其中的标题不再完整（缺少新增的、仍包含已删除的），此时不再使用，全部查询ES。
+    """
+
+    def __init__(self, es=None, index_name='nankai_news_index', size=10, fetch_size=50,
+                 cache=None, generation_fn=None, local_index=None):
+        self.es = es or get_es()
+        self.local_index = local_index
+        self.index_name = index_name
+        self.size = size
+        self.fetch_size = fetch_size
+        self.cache = cache or SearchCache(
+            max_entries=5000,
+            max_bytes=16 * 1024 * 1024,
+            ttl=600,
+            generation_fn=generation_fn
+        )
+
+        self._inflight = {}  # 前缀 -> 正在进行的ES查询
+        self._lock = threading.Lock()
+
+    def suggest(self, prefix):
+        """返回最多 size 条以 prefix 开头的标题"""
+        key = _normalize(prefix)
+        if not key:
+            return []
+        if self._local_index_current():
+            local = self.local_index.complete(prefix, self.size)
+            if local:
+                return local
+        candidates = self._lookup(key)
+        if candidates is None:
+            candidates = self._fetch_coalesced(prefix, key)
+        return candidates[:self.size]
+
+    def _local_index_current(self):
+        """本地索引写入时的版本与当前索引版本一致时才可以使用"""
+        if self.local_index is None:
+            return False
+        if self.cache.generation_fn is None:
+            return True
+        generation = self.cache.generation()
+        return generation is not None and self.local_index.generation() == generation
+
+    def _lookup(self, key):
+        """依次查找该前缀及更短前缀的缓存，找到完整候选集时本地过滤"""
+        entry = self.cache.get(('suggest', key))
+        if entry is not None:
+            return entry[1]
+        for length in range(len(key) - 1, 0, -1):
+            entry = self.cache.get(('suggest', key[:length]))
+            if entry is None:
+                continue
+            complete, options = entry
+            if not complete:
+                return None
+            candidates = [text for text in options if _normalize(text).startswith(key)]
+            self.cache.set(('suggest', key), (True, candidates))
+            return candidates
+        return None
+
+    def _fetch_coalesced(self, prefix, key):
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            options = self._fetch(prefix)
+            self.cache.set(('suggest', key), (len(options) < self.fetch_size, options))
+            future.set_result(options)
+            return options
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _fetch(self, prefix):
+        body = {
+            "_source": False,
+            "suggest": {
+                "title-suggest": {
+                    "prefix": prefix,
+                    "completion": {
+                        "field": "suggest",
+                        "size": self.fetch_size,
+                        "skip_duplicates": True
+                    }
+                }
+            }
+        }
+        res = self.es.search(index=self.index_name, body=body)
+        suggestions = res.get('suggest', {}).get('title-suggest', [])
+        options = suggestions[0].get('options', []) if suggestions else []
+        return [opt['text'] for opt in options]
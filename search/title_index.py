@@ -0,0 +1,227 @@
+# 标题补全的本地前缀索引
+#
+# 索引程序全量重建时把所有标题（带热度权重）写成一个排好序的二进制文件，Web服务启动时用 mmap 映射，
+# 补全请求在本地二分查找完成，不需要访问ES。文件布局（uint32 均为本机字节序）：
+#   头部       magic, version, hot_length, count, hot_count, hot_k, generation_length
+#   key_offsets[count+1], title_offsets[count+1], weights[count]
+#   hot_offsets[hot_count+1], hot_entries[hot_count * hot_k]
+#   key_blob, title_blob, hot_blob, generation
+# key 是规范化（去空白、小写）后的标题，按UTF-8字节排序；长度不超过 hot_length 的短前缀匹配的标题太多，
+# 预先算好权重最高的 hot_k 条放在 hot_entries 中。generation 是写文件时的索引版本（index_meta.generation），
+# 之后索引被增量同步修改过，文件中的标题就不再完整。
+import heapq
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+DEFAULT_PATH = os.environ.get(
+    'TITLE_SUGGEST_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'title_suggest.bin')
+)
+
+MAGIC = b'NKTS'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIIII')
+NO_ENTRY = 0xFFFFFFFF
+
+
+def normalize(text):
+    return ''.join(text.split()).lower()
+
+
+def load_query_counts(history_collection, limit=5000, min_length=2, max_length=16):
+    """统计搜索历史中最常见的查询，返回 {规范化查询: 次数}"""
+    counts = {}
+    for item in history_collection.aggregate([
+        {"$group": {"_id": "$query", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ]):
+        query = normalize(item['_id'] or '')
+        if min_length <= len(query) <= max_length:
+            counts[query] = counts.get(query, 0) + item['count']
+    return counts
+
+
+def title_weight(title, query_counts):
+    """标题热度：1 加上标题中出现的各个热门查询的搜索次数"""
+    text = normalize(title)
+    if not query_counts or not text:
+        return 1
+    lengths = {len(query) for query in query_counts}
+    matched = {
+        text[i:i + length]
+        for length in lengths
+        for i in range(len(text) - length + 1)
+        if text[i:i + length] in query_counts
+    }
+    return 1 + sum(query_counts[query] for query in matched)
+
+
+def _padded(data):
+    return data + b'\0' * (-len(data) % 4)
+
+
+def write_title_index(path, title_weights, generation=None, hot_length=2, hot_k=10):
+    """把 {标题: 权重} 写成前缀索引文件，先写临时文件再替换，读取方不会看到写了一半的文件"""
+    entries = sorted(
+        (normalize(title).encode('utf-8'), title.encode('utf-8'), weight)
+        for title, weight in title_weights.items() if normalize(title)
+    )
+
+    key_offsets, title_offsets, weights = array('I', [0]), array('I', [0]), array('I')
+    key_blob, title_blob = bytearray(), bytearray()
+    hot = defaultdict(list)  # 短前缀 -> 最小堆 [(权重, 序号)]
+    for i, (key, title, weight) in enumerate(entries):
+        key_blob += key
+        title_blob += title
+        key_offsets.append(len(key_blob))
+        title_offsets.append(len(title_blob))
+        weights.append(min(weight, NO_ENTRY - 1))
+        text = key.decode('utf-8')
+        for length in range(1, min(hot_length, len(text)) + 1):
+            heap = hot[text[:length].encode('utf-8')]
+            if len(heap) < hot_k:
+                heapq.heappush(heap, (weight, -i))
+            elif (weight, -i) > heap[0]:
+                heapq.heapreplace(heap, (weight, -i))
+
+    hot_offsets, hot_entries, hot_blob = array('I', [0]), array('I'), bytearray()
+    for prefix in sorted(hot):
+        hot_blob += prefix
+        hot_offsets.append(len(hot_blob))
+        ranked = [-i for _, i in sorted(hot[prefix], reverse=True)]
+        hot_entries.extend(ranked + [NO_ENTRY] * (hot_k - len(ranked)))
+
+    generation_blob = (generation or '').encode('utf-8')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, hot_length, len(entries), len(hot), hot_k, len(generation_blob)))
+        for section in (key_offsets, title_offsets, weights, hot_offsets, hot_entries):
+            f.write(section.tobytes())
+        for blob in (key_blob, title_blob, hot_blob, generation_blob):
+            f.write(_padded(bytes(blob)))
+    os.replace(tmp_path, path)
+    return len(entries)
+
+
+class TitleIndex:
+    """只读的前缀索引，文件被索引程序替换后自动重新映射"""
+
+    def __init__(self, path=DEFAULT_PATH, max_scan=20000, reload_check_interval=60):
+        self.path = path
+        self.max_scan = max_scan
+        self.reload_check_interval = reload_check_interval
+
+        self._lock = threading.Lock()
+        self._data = None
+        self._generation = None
+        self._mtime = None
+        self._checked_at = 0
+        self._load()
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            self._data = None
+            self._generation = None
+            return
+        if mtime == self._mtime:
+            return
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mm) < HEADER.size or HEADER.unpack_from(mm, 0)[:2] != (MAGIC, VERSION):
+            # 格式不对（如版本不一致）时继续使用原来的数据，补全回退到ES
+            mm.close()
+            return
+        _, _, hot_length, count, hot_count, hot_k, generation_length = HEADER.unpack_from(mm, 0)
+
+        view = memoryview(mm)
+        pos = HEADER.size
+
+        def take_uint32(n):
+            nonlocal pos
+            section = view[pos:pos + 4 * n].cast('I')
+            pos += 4 * n
+            return section
+
+        def take_blob(size):
+            nonlocal pos
+            blob = view[pos:pos + size]
+            pos += size + (-size % 4)
+            return blob
+
+        key_offsets = take_uint32(count + 1)
+        title_offsets = take_uint32(count + 1)
+        weights = take_uint32(count)
+        hot_offsets = take_uint32(hot_count + 1)
+        hot_entries = take_uint32(hot_count * hot_k)
+        keys = take_blob(key_offsets[count])
+        titles = take_blob(title_offsets[count])
+        hot_keys = take_blob(hot_offsets[hot_count])
+        generation = bytes(take_blob(generation_length)).decode('utf-8') or None
+
+        # 旧的映射不主动关闭，仍在使用它的请求结束后由垃圾回收释放
+        self._data = (hot_length, hot_k, key_offsets, title_offsets, weights,
+                      hot_offsets, hot_entries, keys, titles, hot_keys)
+        self._generation = generation
+        self._mtime = mtime
+
+    def _current(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_check_interval:
+            with self._lock:
+                if now - self._checked_at >= self.reload_check_interval:
+                    self._checked_at = now
+                    self._load()
+        return self._data
+
+    def generation(self):
+        """写文件时的索引版本，索引未加载或文件没有记录版本时返回 None"""
+        self._current()
+        return self._generation
+
+    def complete(self, prefix, size=10):
+        """返回按热度排序的补全标题；索引未加载、没有匹配或匹配太多无法快速排序时返回 None"""
+        data = self._current()
+        text = normalize(prefix)
+        if data is None or not text:
+            return None
+        (hot_length, hot_k, key_offsets, title_offsets, weights,
+         hot_offsets, hot_entries, keys, titles, hot_keys) = data
+        target = text.encode('utf-8')
+
+        def title(i):
+            return bytes(titles[title_offsets[i]:title_offsets[i + 1]]).decode('utf-8')
+
+        if len(text) <= hot_length:
+            slot = self._bisect(hot_keys, hot_offsets, len(hot_offsets) - 1, target)
+            if slot >= len(hot_offsets) - 1 or bytes(hot_keys[hot_offsets[slot]:hot_offsets[slot + 1]]) != target:
+                return None
+            ranked = hot_entries[slot * hot_k:slot * hot_k + min(size, hot_k)]
+            return [title(i) for i in ranked if i != NO_ENTRY]
+
+        count = len(weights)
+        lo = self._bisect(keys, key_offsets, count, target)
+        hi = self._bisect(keys, key_offsets, count, target + b'\xff')
+        if lo >= hi or hi - lo > self.max_scan:
+            return None
+        return [title(i) for i in heapq.nlargest(size, range(lo, hi), key=weights.__getitem__)]
+
+    @staticmethod
+    def _bisect(blob, offsets, count, target):
+        """第一个不小于 target 的条目序号"""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(blob[offsets[mid]:offsets[mid + 1]]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
@@ -0,0 +1,103 @@
+# 附件存储：流式写入GridFS，限制大小和类型，按URL和内容哈希去重
+
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+
+from pymongo import ASCENDING
+
+
+class AttachmentStore:
+    def __init__(self, db, fs, max_bytes=50 * 1024 * 1024, blocked_content_types=('text/html',), timeout=300):
+        self.fs = fs
+        self.files_collection = db['fs.files']
+        self.url_collection = db['attachment_urls']  # URL -> file_id，跳过的URL也记录原因
+        self.max_bytes = max_bytes
+        self.blocked_content_types = blocked_content_types
+        self.timeout = timeout
+
+        self._url_cache = {}
+        self._inflight = {}
+
+        self.files_collection.create_index([('sha256', ASCENDING)])
+
+    async def save(self, fetcher, attachment_info):
+        """保存附件，返回 file_id；同一URL在并发抓取中只下载一次"""
+        url = attachment_info['url']
+        if url in self._url_cache:
+            return self._url_cache[url]
+        task = self._inflight.get(url)
+        if task is None:
+            task = self._inflight[url] = asyncio.ensure_future(self._save(fetcher, attachment_info))
+        try:
+            return await task
+        finally:
+            self._inflight.pop(url, None)
+
+    async def _save(self, fetcher, attachment_info):
+        url = attachment_info['url']
+        known = await asyncio.to_thread(self.url_collection.find_one, {'_id': url})
+        if known:
+            file_id = known.get('file_id')
+            self._url_cache[url] = file_id
+            return file_id
+
+        try:
+            file_id, reason = await self._download(fetcher, attachment_info)
+        except Exception as e:
+            logging.error(f"Error saving attachment {url}: {str(e)}")
+            return None
+        if file_id is None and reason is None:
+            return None  # 请求失败，下次抓取重试
+
+        record = {'file_id': file_id, 'saved_at': datetime.now()}
+        if reason:
+            record['skipped'] = reason
+            logging.warning(f"Attachment skipped ({reason}): {url}")
+        await asyncio.to_thread(self.url_collection.update_one, {'_id': url}, {'$set': record}, upsert=True)
+        self._url_cache[url] = file_id
+        return file_id
+
+    async def _download(self, fetcher, attachment_info):
+        """边下载边写入GridFS，返回 (file_id, 跳过原因)"""
+        async with fetcher.open_stream(attachment_info['url'], timeout=self.timeout) as response:
+            if response.status != 200:
+                logging.warning(f"Failed to fetch {attachment_info['url']}, status code: {response.status}")
+                return None, None
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type in self.blocked_content_types:
+                return None, f'content type {content_type}'
+            if (response.content_length or 0) > self.max_bytes:
+                return None, f'size {response.content_length}'
+
+            grid_in = self.fs.new_file(
+                filename=attachment_info['filename'],
+                url=attachment_info['url'],
+                title=attachment_info['title'],
+                content_type=content_type or None,
+                upload_date=datetime.now()
+            )
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                async for chunk in response.content.iter_chunked(256 * 1024):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        await asyncio.to_thread(grid_in.abort)
+                        return None, f'size > {self.max_bytes}'
+                    digest.update(chunk)
+                    await asyncio.to_thread(grid_in.write, chunk)
+            except BaseException:
+                await asyncio.to_thread(grid_in.abort)
+                raise
+
+        # 相同内容已经存过时丢弃这次上传，复用已有文件
+        sha256 = digest.hexdigest()
+        existing = await asyncio.to_thread(self.files_collection.find_one, {'sha256': sha256}, {'_id': 1})
+        if existing:
+            await asyncio.to_thread(grid_in.abort)
+            return existing['_id'], None
+        grid_in.sha256 = sha256
+        await asyncio.to_thread(grid_in.close)
+        return grid_in._id, None
@@ -0,0 +1,128 @@
+# 异步抓取引擎：共享连接池、按站点令牌桶限速、全局并发上限
+
+import asyncio
+import logging
+import random
+import time
+from collections import namedtuple
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+# 条件请求的结果：status 为 304 时 text 为 None
+FetchResult = namedtuple('FetchResult', ['status', 'text', 'etag', 'last_modified'])
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 个请求，最多允许 capacity 个突发请求"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncFetcher:
+    """基于 aiohttp 的抓取器，需要在 async with 中使用"""
+
+    def __init__(self, headers, max_concurrency=20, per_host_concurrency=4,
+                 host_rate=1.0, host_burst=3, timeout=10, retries=3):
+        self.headers = headers
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.timeout = timeout
+        self.retries = retries
+
+        self.session = None
+        self._semaphore = None
+        self._buckets = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            limit_per_host=self.per_host_concurrency,
+            ttl_dns_cache=300
+        )
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.host_rate, self.host_burst)
+        return bucket
+
+    async def fetch_conditional(self, url, etag=None, last_modified=None, encoding='utf-8'):
+        """带 If-None-Match / If-Modified-Since 的请求，失败返回 None"""
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        async def read(response):
+            text = None
+            if response.status == 200:
+                text = await response.text(encoding=encoding, errors='replace')
+            return FetchResult(
+                response.status,
+                text,
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified')
+            )
+        return await self._request(url, read, self.timeout, headers=headers, ok_statuses=(200, 304))
+
+    @asynccontextmanager
+    async def open_stream(self, url, timeout=300):
+        """以流的方式打开响应（用于大附件），调用方自行检查状态码并分块读取"""
+        await self._bucket(url).acquire()
+        async with self._semaphore:
+            async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                yield response
+
+    async def _request(self, url, read, timeout, headers=None, ok_statuses=(200,)):
+        for i in range(self.retries):
+            # 先等站点令牌再占用全局并发名额，限速等待不会占着连接
+            await self._bucket(url).acquire()
+            try:
+                async with self._semaphore:
+                    async with self.session.get(url, headers=headers,
+                                                timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                        if response.status in ok_statuses:
+                            return await read(response)
+                        logging.warning(f"Failed to fetch {url}, status code: {response.status}")
+                        if response.status < 500 and response.status != 429:
+                            return None
+            except Exception as e:
+                logging.error(f"Attempt {i + 1} failed for {url}: {str(e)}")
+            if i < self.retries - 1:
+                # 指数退避加随机抖动
+                await asyncio.sleep(2 ** i + random.uniform(0, 1))
+        logging.error(f"All attempts failed for {url}")
+        return None
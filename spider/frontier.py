@@ -0,0 +1,139 @@
+# 持久化的抓取队列（frontier）：按规范化URL去重，记录每个URL的状态与优先级，多个爬虫进程通过租约领取任务
+
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def normalize_url(url):
+    """规范化URL作为去重键：小写协议和主机、去掉默认端口和锚点、查询参数排序"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+class CrawlFrontier:
+    def __init__(self, collection, lease_seconds=600, max_attempts=3):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.collection.create_index([('kind', ASCENDING), ('status', ASCENDING), ('priority', DESCENDING)])
+
+    def _outstanding_filter(self, now):
+        # 待处理的，或者租约已经过期（领取它的进程可能已经崩溃）
+        return {'$or': [
+            {'status': PENDING},
+            {'status': LEASED, 'lease_until': {'$lt': now}}
+        ]}
+
+    def has_outstanding(self, kind=None):
+        """是否还有未完成（待处理或已被领取）的任务"""
+        query = {'status': {'$in': [PENDING, LEASED]}}
+        if kind:
+            query['kind'] = kind
+        return self.collection.count_documents(query, limit=1) > 0
+
+    def seed(self, urls, kind='list', priority=0, site=None):
+        """开始新一轮抓取：加入种子URL，并把上一轮已结束的任务重新置为待处理"""
+        now = datetime.now()
+        self.collection.update_many(
+            {'status': {'$in': [DONE, FAILED]}},
+            {'$set': {'status': PENDING, 'attempts': 0, 'updated_at': now}}
+        )
+        operations = []
+        for i, url in enumerate(urls):
+            operations.append(UpdateOne(
+                {'_id': normalize_url(url)},
+                {
+                    '$setOnInsert': {'url': url, 'kind': kind, 'site': site, 'status': PENDING, 'attempts': 0},
+                    '$set': {'updated_at': now},
+                    '$max': {'priority': priority(i) if callable(priority) else priority}
+                },
+                upsert=True
+            ))
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def lease(self, worker_id, kind='list', limit=10):
+        """按优先级领取最多 limit 个任务"""
+        jobs = []
+        for _ in range(limit):
+            now = datetime.now()
+            job = self.collection.find_one_and_update(
+                {'kind': kind, **self._outstanding_filter(now)},
+                {
+                    '$set': {
+                        'status': LEASED,
+                        'lease_owner': worker_id,
+                        'lease_until': now + timedelta(seconds=self.lease_seconds),
+                        'updated_at': now
+                    },
+                    '$inc': {'attempts': 1}
+                },
+                sort=[('priority', DESCENDING)],
+                return_document=ReturnDocument.AFTER
+            )
+            if not job:
+                break
+            jobs.append(job)
+        return jobs
+
+    def claim(self, url, worker_id, kind='detail', site=None):
+        """领取单个URL（如列表页中发现的详情页），已被领取或本轮已完成时返回 False"""
+        now = datetime.now()
+        try:
+            self.collection.find_one_and_update(
+                {'_id': normalize_url(url), **self._outstanding_filter(now)},
+                {
+                    '$set': {
+                        'url': url,
+                        'kind': kind,
+                        'site': site,
+                        'status': LEASED,
+                        'lease_owner': worker_id,
+                        'lease_until': now + timedelta(seconds=self.lease_seconds),
+                        'updated_at': now
+                    },
+                    '$inc': {'attempts': 1}
+                },
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def complete(self, urls):
+        """标记任务完成"""
+        keys = [normalize_url(url) for url in urls]
+        if keys:
+            self.collection.update_many(
+                {'_id': {'$in': keys}},
+                {'$set': {'status': DONE, 'updated_at': datetime.now()}, '$unset': {'lease_owner': '', 'lease_until': ''}}
+            )
+
+    def fail(self, url, error=''):
+        """任务失败，未超过重试次数时放回队列"""
+        key = normalize_url(url)
+        job = self.collection.find_one({'_id': key}, {'attempts': 1}) or {}
+        status = FAILED if job.get('attempts', 0) >= self.max_attempts else PENDING
+        self.collection.update_one(
+            {'_id': key},
+            {'$set': {'status': status, 'error': error, 'updated_at': datetime.now()},
+             '$unset': {'lease_owner': '', 'lease_until': ''}}
+        )
+
+    def stats(self):
+        return {item['_id']: item['count'] for item in self.collection.aggregate([
+            {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
+        ])}
@@ -0,0 +1,224 @@
+# 各站点的抓取配置与解析器
+#
+# 每个站点一条配置，未写的字段使用 DEFAULT_SITE。学校各院系网站大多是同一套 WebPlus 模板
+# （列表项 li.news、正文 div.wp_articlecontent），新增站点通常只需要填写名称和列表页地址。
+#
+# parser 可选 'selectolax'（C实现，只在需要的节点上取文本，不构建BeautifulSoup树）、
+# 'lxml' 或 'html.parser'；未安装对应库时自动退回可用的解析器。
+
+import logging
+import os
+import re
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    import lxml  # noqa: F401  只用于判断 BeautifulSoup 能否使用 lxml 解析器
+    SOUP_PARSER = 'lxml'
+except ImportError:
+    SOUP_PARSER = 'html.parser'
+
+DEFAULT_PARSER = 'selectolax' if HTMLParser is not None else SOUP_PARSER
+
+# 支持的附件类型
+ATTACHMENT_EXTENSIONS = [
+    "pdf", "doc", "docx", "xls", "xlsx", "ppt", "pptx",  # 常见文档格式
+    "mp3", "mp4", "avi", "mkv", "mov", "wmv", "flv",  # 音频和视频格式
+    "zip", "rar", "tar", "gz", "bz2", "7z",  # 压缩文件格式
+    "jpg", "jpeg", "png", "gif", "bmp", "tiff",  # 图片格式
+    "exe", "apk", "dmg",  # 可执行文件和应用程序
+    "csv", "txt", "rtf",  # 文本文件
+]
+# 链接路径以附件扩展名结尾（后面可以跟查询参数），一次正则匹配代替逐个扩展名查找
+ATTACHMENT_PATTERN = re.compile(
+    r'\.(?:' + '|'.join(sorted(ATTACHMENT_EXTENSIONS, key=len, reverse=True)) + r')(?=$|[?#&])',
+    re.IGNORECASE
+)
+
+DEFAULT_SITE = {
+    'parser': DEFAULT_PARSER,                          # HTML解析器
+    'max_pages': 1,                                    # 除首页外的分页数量
+    'list_item_selector': 'li.news',                   # 列表中每条新闻
+    'link_selector': 'span.news_title a[href]',        # 新闻标题链接（相对列表项）
+    'date_selector': 'span.news_meta',                 # 新闻日期（相对列表项）
+    'content_selector': 'td#txt, div.wp_articlecontent',  # 详情页正文
+    'date_format': '%Y-%m-%d',                         # 列表中日期的格式
+}
+
+SITES = [
+    {
+        'name': 'math',
+        'base_url': 'http://math.nankai.edu.cn',
+        'first_page': 'http://math.nankai.edu.cn/yjspy/list.htm',
+        'page_template': 'https://math.nankai.edu.cn/yjspy/list{}.htm',
+        'max_pages': 4,
+    },
+]
+
+# 配置的正文选择器没有命中时依次尝试的通用选择器
+FALLBACK_CONTENT_SELECTORS = [
+    'td#txt',
+    'div.wp_articlecontent',
+    'div#content',
+    'div.article-content',
+    'div.content',
+    'div#vsb_content',
+    'div#vsb_content_2',
+    'article.blog',
+    'article',
+    'section#main-content',
+]
+
+SOURCE_PATTERN = re.compile('来源：')
+
+
+class SiteExtractor:
+    """按站点配置预编译选择器，解析列表页和详情页"""
+
+    def __init__(self, config):
+        self.config = {**DEFAULT_SITE, **config}
+        self.name = self.config['name']
+        self.base_url = self.config['base_url']
+        self.parser = self.config['parser']
+        if self.parser == 'selectolax' and HTMLParser is None:
+            logging.warning(f"selectolax is not installed, site {self.name} falls back to {SOUP_PARSER}")
+            self.parser = SOUP_PARSER
+        self.list_item = soupsieve.compile(self.config['list_item_selector'])
+        self.link = soupsieve.compile(self.config['link_selector'])
+        self.date = soupsieve.compile(self.config['date_selector'])
+        self.content = soupsieve.compile(self.config['content_selector'])
+        self.fallback_content = [soupsieve.compile(selector) for selector in FALLBACK_CONTENT_SELECTORS]
+
+    def page_urls(self):
+        """生成该站点所有列表页的URL"""
+        urls = [self.config['first_page']]  # 第一页
+        # 添加后续页面
+        urls.extend(self.config['page_template'].format(i) for i in range(1, self.config['max_pages'] + 1))
+        return urls
+
+    def parse_list(self, html, page_url):
+        """提取列表页中的新闻条目：标题、链接、日期"""
+        if self.parser == 'selectolax':
+            return self._parse_list_selectolax(html, page_url)
+
+        entries = []
+        soup = BeautifulSoup(html, self.parser)
+        for block in self.list_item.select(soup):
+            a_tag = self.link.select_one(block)
+            if not a_tag:
+                continue
+            date_tag = self.date.select_one(block)
+            entries.append(self._list_entry(
+                a_tag.get_text(strip=True),
+                a_tag['href'],
+                date_tag.get_text(strip=True) if date_tag else '',
+                page_url
+            ))
+        return entries
+
+    def parse_detail(self, html, page_url):
+        """提取详情页的来源、正文和附件链接"""
+        if self.parser == 'selectolax':
+            return self._parse_detail_selectolax(html, page_url)
+
+        soup = BeautifulSoup(html, self.parser)
+        source_span = soup.find('span', string=SOURCE_PATTERN)
+        source = source_span.text.strip() if source_span else ''
+
+        attachments = [
+            self._attachment(link['href'], link.text, page_url)
+            for link in soup.find_all('a', href=ATTACHMENT_PATTERN)
+        ]
+
+        content_div = self.content.select_one(soup)
+        if content_div is None:
+            for selector in self.fallback_content:
+                content_div = selector.select_one(soup)
+                if content_div is not None:
+                    break
+        if content_div is None:
+            return {'source': source, 'content': '', 'attachments': attachments}
+
+        paragraphs = [p.get_text(strip=True) for p in content_div.find_all('p')]
+        paragraphs = [text for text in paragraphs if text]
+        if paragraphs:
+            content = '\n'.join(paragraphs)
+        else:
+            content = content_div.get_text(separator='\n', strip=True)
+        return {'source': source, 'content': content, 'attachments': attachments}
+
+    def _parse_list_selectolax(self, html, page_url):
+        entries = []
+        for block in HTMLParser(html).css(self.config['list_item_selector']):
+            a_tag = block.css_first(self.config['link_selector'])
+            if a_tag is None:
+                continue
+            date_tag = block.css_first(self.config['date_selector'])
+            entries.append(self._list_entry(
+                a_tag.text(strip=True),
+                a_tag.attributes.get('href') or '',
+                date_tag.text(strip=True) if date_tag is not None else '',
+                page_url
+            ))
+        return entries
+
+    def _parse_detail_selectolax(self, html, page_url):
+        tree = HTMLParser(html)
+        source = ''
+        for span in tree.css('span'):
+            text = span.text(deep=False)
+            if SOURCE_PATTERN.search(text):
+                source = text.strip()
+                break
+
+        attachments = []
+        for link in tree.css('a[href]'):
+            href = link.attributes.get('href') or ''
+            if ATTACHMENT_PATTERN.search(href):
+                attachments.append(self._attachment(href, link.text(), page_url))
+
+        content_node = tree.css_first(self.config['content_selector'])
+        if content_node is None:
+            for selector in FALLBACK_CONTENT_SELECTORS:
+                content_node = tree.css_first(selector)
+                if content_node is not None:
+                    break
+        if content_node is None:
+            return {'source': source, 'content': '', 'attachments': attachments}
+
+        paragraphs = [p.text(strip=True) for p in content_node.css('p')]
+        paragraphs = [text for text in paragraphs if text]
+        if paragraphs:
+            content = '\n'.join(paragraphs)
+        else:
+            content = content_node.text(separator='\n', strip=True)
+        return {'source': source, 'content': content, 'attachments': attachments}
+
+    def _list_entry(self, title, href, date_text, page_url):
+        return {
+            'title': title,
+            'url': urljoin(page_url, href),
+            'date': self.normalize_date(date_text)
+        }
+
+    def _attachment(self, href, text, page_url):
+        return {
+            'url': urljoin(page_url, href),
+            'filename': os.path.basename(urlsplit(href).path),
+            'title': text.strip()
+        }
+
+    def normalize_date(self, text):
+        """按站点日期格式转成 yyyy-mm-dd，无法解析时保留原文"""
+        try:
+            return datetime.strptime(text, self.config['date_format']).strftime('%Y-%m-%d')
+        except ValueError:
+            return text
@@ -1,52 +1,58 @@
 # 爬取网页和文档信息，保存网页快照
 
 import os #用于处理文件和路径。
-import requests #用于发送 HTTP 请求，获取网页内容。
-from bs4 import BeautifulSoup #用于解析 HTML 文档，提取所需信息。
-from concurrent.futures import ThreadPoolExecutor #用于多线程处理，提高爬取效率。
+import asyncio #用于异步并发抓取。
 
-from pymongo import MongoClient #用于连接和操作 MongoDB 数据库。
-from pymongo.errors import DuplicateKeyError #用于处理 MongoDB 中的重复键错误。
+from pymongo import UpdateOne #批量写入的操作类型。
 import logging #用于记录日志，方便调试和错误追踪。
 import gridfs #用于在 MongoDB 中存储大文件（如附件）。
 
 from datetime import datetime #用于处理日期和时间。
-import re #用于正则表达式操作。
-import time #用于时间相关的操作，如延时。
-import random #用于生成随机数，增加请求的随机性以防止被网站封禁。
 import hashlib #用于生成内容的哈希值，以便快速比较和去重。
-
-from urllib.parse import urljoin
+import socket #用于生成爬虫进程标识。
+
+import sys
+
+# 项目根目录放在最前面，否则 spider 包会被本文件 spider.py 遮住
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.connections import get_mongo_db, close_connections #共享的 MongoDB 连接池。
+from common.snapshot_store import SnapshotStore #按内容哈希去重、压缩存储网页快照。
+from spider.fetcher import AsyncFetcher #异步抓取引擎，按站点限速。
+from spider.frontier import CrawlFrontier #持久化的抓取队列，支持断点续爬和多进程。
+from spider.sites import SITES, SiteExtractor #各站点的抓取配置与解析器。
+from spider.attachments import AttachmentStore #附件流式写入GridFS并去重。
+from spider.writer import BulkWriter #缓冲写操作，批量提交到MongoDB。
 #-----------------------------------------------------------------------------------------------------------------------
 class spider:
-    def __init__(self):
-        # 基础配置
-        self.base_url =  "http://math.nankai.edu.cn"
-        self.first_page = "http://math.nankai.edu.cn/yjspy/list.htm"
-        self.page_template = "https://math.nankai.edu.cn/yjspy/list{}.htm"
-        self.max_pages = 4
+    def __init__(self, sites=None, max_concurrency=20, per_host_concurrency=4, host_rate=1.0, host_burst=3,
+                 max_attachment_bytes=50 * 1024 * 1024, write_batch_size=500, write_flush_interval=5):
+        # 基础配置：每个站点的选择器在这里编译一次
+        self.extractors = {config['name']: SiteExtractor(config) for config in (sites or SITES)}
+
+        # 抓取并发与礼貌限速：全局最多 max_concurrency 个请求，每个站点每秒 host_rate 个请求
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.fetcher = None
 
         # MongoDB连接设置
-        self.mongo_client = MongoClient('mongodb://localhost:27017/')
-        self.db = self.mongo_client['nku_news'] # 数据库名称
+        self.db = get_mongo_db() # 数据库名称见 MONGO_DB
         self.news_collection = self.db['NEWS'] # 新闻数据集合
-        self.snapshot_collection = self.db['WEB_snapshot']  # 网页快照集合
+        self.snapshot_store = SnapshotStore(self.db)  # 网页快照：压缩正文按内容哈希存一份，每次抓取只记录元数据
+        self.fetch_state_collection = self.db['fetch_state']  # 每个URL的ETag/Last-Modified/内容哈希
         self.fs = gridfs.GridFS(self.db)  # 用于存储附件
+        self.attachment_store = AttachmentStore(self.db, self.fs, max_bytes=max_attachment_bytes)
+        self.frontier = CrawlFrontier(self.db['crawl_frontier'])  # 抓取队列
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"  # 领取任务时使用的进程标识
+        # 新闻、快照和抓取状态的写入先缓冲，攒够 write_batch_size 条或每隔 write_flush_interval 秒批量提交
+        self.writer = BulkWriter(batch_size=write_batch_size, flush_interval=write_flush_interval)
+        # 抓取状态不进入上面的自动提交，这一批的新闻和快照写入成功后才保存
+        self.pending_fetch_states = []
 
         # 创建索引，保证数据的唯一性和查询效率
         self.news_collection.create_index([('url', 1)], unique=True)
-        self.snapshot_collection.create_index([('url', 1), ('captured_at', -1)])
-
-        # 支持的附件类型
-        self.supported_attachments = [
-            ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",  # 常见文档格式
-            ".mp3", ".mp4", ".avi", ".mkv", ".mov", ".wmv", ".flv",  # 音频和视频格式
-            ".zip", ".rar", ".tar", ".gz", ".bz2", ".7z",  # 压缩文件格式
-            ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff",  # 图片格式
-            ".exe", ".apk", ".dmg",  # 可执行文件和应用程序
-            ".csv", ".txt", ".rtf",  # 文本文件
-            ".xls", ".xlsx",  # 表格文件
-        ]
+        self.snapshot_store.create_indexes()
 
         # 日志配置
         logging.basicConfig(
@@ -65,257 +71,276 @@ class spider:
             'Connection': 'keep-alive'
         }
 #-----------------------------------------------------------------------------------------------------------------------
-    def get_page_urls(self):
-        """生成所有页面的URL"""
-        urls = [self.first_page]  # 第一页
-        # 添加后续页面
-        urls.extend(self.page_template.format(i) for i in range(1, self.max_pages+1))
-        return urls
+    def seed_frontier(self):
+        """把所有站点的列表页加入抓取队列，越靠前的列表页优先级越高"""
+        for extractor in self.extractors.values():
+            urls = extractor.page_urls()
+            self.frontier.seed(urls, kind='list', priority=lambda i: len(urls) - i, site=extractor.name)
     
-    def get_soup(self, url, retries=3):
-        """获取页面的BeautifulSoup对象和原始HTML内容"""
-        for i in range(retries):
-            try:
-                time.sleep(random.uniform(2, 5))
-                response = requests.get(url, headers=self.headers, timeout=10)
-                response.encoding = 'utf-8'
-
-                if response.status_code == 200:
-                    html_content = response.text
-                    return BeautifulSoup(html_content, 'html.parser'), html_content
-                else:
-                    logging.warning(f"Failed to fetch {url}, status code: {response.status_code}")
-
-            except Exception as e:
-                logging.error(f"Attempt {i + 1} failed for {url}: {str(e)}")
-                if i == retries - 1:
-                    logging.error(f"All attempts failed for {url}")
-                    return None, None
-                time.sleep(random.uniform(2, 5))
-        return None, None
-
-    def save_snapshot(self, url, html_content):
-        """保存网页快照"""
+    async def fetch_page(self, url):
+        """条件请求获取页面
+
+        返回 (状态, 原始HTML, 内容哈希, 抓取状态)，状态为 'changed'、'unchanged' 或 'failed'。
+        服务器返回 304 或内容哈希与上次相同时视为 'unchanged'，调用方可以跳过解析和保存。
+        """
+        state = await asyncio.to_thread(self.fetch_state_collection.find_one, {'_id': url}) or {}
+        result = await self.fetcher.fetch_conditional(url, state.get('etag'), state.get('last_modified'))
+        if result is None:
+            return 'failed', None, None, None
+        if result.status == 304:
+            return 'unchanged', None, None, None
+
+        content_hash = hashlib.md5(result.text.encode('utf-8')).hexdigest()
+        new_state = {
+            'etag': result.etag,
+            'last_modified': result.last_modified,
+            'content_hash': content_hash
+        }
+        if content_hash == state.get('content_hash'):
+            # 内容没变但服务器换了 ETag/Last-Modified（如每次部署重新生成）时记下新的值，下次才能得到 304
+            if (result.etag, result.last_modified) != (state.get('etag'), state.get('last_modified')):
+                self.save_fetch_state(url, new_state)
+            return 'unchanged', None, None, None
+        return 'changed', result.text, content_hash, new_state
+
+    def save_fetch_state(self, url, state):
+        """页面处理完成后记下抓取状态，所在批次的数据写入成功后由 commit_fetch_states 保存"""
+        state['fetched_at'] = datetime.now()
+        self.pending_fetch_states.append(UpdateOne({'_id': url}, {'$set': state}, upsert=True))
+
+    def commit_fetch_states(self):
+        """保存这一批的抓取状态；写入失败时抛出异常，页面下次会重新抓取"""
+        operations, self.pending_fetch_states = self.pending_fetch_states, []
+        if operations:
+            self.fetch_state_collection.bulk_write(operations, ordered=False)
+
+    def save_snapshot(self, url, html_content, content_hash=None):
+        """保存网页快照（批量写入，返回内容哈希）"""
         try:
-            snapshot_data = {
-                'url': url,
-                'html_content': html_content,
-                'captured_at': datetime.now(),
-                'content_hash': hashlib.md5(html_content.encode('utf-8')).hexdigest()
-            }
-            self.snapshot_collection.insert_one(snapshot_data)
-            return snapshot_data['content_hash']
+            content_hash = content_hash or hashlib.md5(html_content.encode('utf-8')).hexdigest()
+            for collection, operation in self.snapshot_store.capture_operations(url, html_content, content_hash):
+                self.writer.add(collection, operation)
+            return content_hash
         except Exception as e:
             logging.error(f"Error saving snapshot for {url}: {str(e)}")
             return None
 
-    def find_attachments(self, soup, url):
-        attachments = []
-        for link in soup.find_all('a', href=True):
-            href = link['href'].lower()
-            if any(ext in href for ext in self.supported_attachments):
-                full_url = self.base_url + href if href.startswith('/') else href
-                attachments.append({
-                'url': full_url,
-                'filename': os.path.basename(href),
-                'title': link.text.strip()
-                })
-        return attachments
-
-    def save_attachment(self, attachment_info):
-        """保存附件到GridFS"""
-        try:
-            response = requests.get(attachment_info['url'], headers=self.headers, timeout=30)
-            if response.status_code == 200:
-                file_id = self.fs.put(
-                    response.content,
-                    filename=attachment_info['filename'],
-                    url=attachment_info['url'],
-                    title=attachment_info['title'],
-                    upload_date=datetime.now()
-                )
-                return file_id
-        except Exception as e:
-            logging.error(f"Error saving attachment {attachment_info['url']}: {str(e)}")
-        return None
+    async def save_attachment(self, attachment_info):
+        """保存附件到GridFS（流式写入，超过大小上限或类型不符的跳过，同一附件只存一次）"""
+        return await self.attachment_store.save(self.fetcher, attachment_info)
 # -----------------------------------------------------------------------------------------------------------------------
-    def parse_news_list_page(self, url):
-        """解析新闻列表页面"""
-        soup, html_content = self.get_soup(url)
-        if not soup:
+    async def parse_news_list_page(self, url, extractor):
+        """解析新闻列表页面，列表中的详情页并发抓取；抓取失败返回 None"""
+        status, html_content, content_hash, fetch_state = await self.fetch_page(url)
+        if status == 'unchanged':
+            logging.info(f"List page unchanged, skipped: {url}")
             return []
+        if status == 'failed':
+            return None
 
         # 保存列表页快照
-        snapshot_hash = self.save_snapshot(url, html_content)
-
-        news_items = []
-
-        # 找到所有新闻块
-        news_blocks = soup.find_all('li', class_='news')
-        for block in news_blocks:
-            try:
-                # 提取标题和链接
-                title_span = block.find('span', class_='news_title')
-                a_tag = title_span.find('a', href=True) if title_span else None
-                if not a_tag:
-                    continue
-                title = a_tag.get_text(strip=True)
-                href = a_tag['href']
-                news_url = urljoin(url, href)
-
-                # 提取日期
-                date_span = block.find('span', class_='news_meta')
-                date = date_span.get_text(strip=True) if date_span else ''
-
-                logging.info(f"Processing: {title}")
-
-                # 获取新闻详细内容和快照
-                article_content, article_snapshot_hash, article_attachments = self.parse_news_detail(news_url)
-
-                news_item = {
-                    'title': title,
-                    'url': news_url,
-                    'date': date,
-                    'source': article_content.get('source', ''),
-                    'content': article_content.get('content', ''),
-                    'snapshot_hash': article_snapshot_hash,
-                    'attachments': article_attachments
-                }
-
-                news_items.append(news_item)
+        await asyncio.to_thread(self.save_snapshot, url, html_content, content_hash)
+
+        # 按站点配置提取所有新闻条目
+        entries = extractor.parse_list(html_content, url)
+        outcomes = await asyncio.gather(*(self.parse_news_block(entry, extractor) for entry in entries))
+
+        # 有详情页抓取失败时不记录列表页的抓取状态，下次列表页不会被判为未变化，失败的详情页会重新抓取
+        if any(status == 'failed' for status, _ in outcomes):
+            logging.warning(f"Some detail pages failed, list page will be fetched again: {url}")
+        else:
+            self.save_fetch_state(url, fetch_state)
+        return [item for status, item in outcomes if status == 'changed']
+
+    async def parse_news_block(self, entry, extractor):
+        """抓取列表中单条新闻的详情页，返回 (状态, 新闻)，状态为 'changed'、'unchanged'、'skipped' 或 'failed'"""
+        news_url = entry['url']
+        try:
+            title = entry['title']
+
+            # 同一详情页可能出现在多个列表页，或已被其他爬虫进程领取
+            if not await asyncio.to_thread(self.frontier.claim, news_url, self.worker_id, 'detail', extractor.name):
+                return 'skipped', None
+
+            logging.info(f"Processing: {title}")
+
+            # 获取新闻详细内容和快照，详情页未变化时不再更新这条新闻
+            status, detail = await self.parse_news_detail(news_url, extractor)
+            if status == 'unchanged':
+                logging.info(f"Unchanged, skipped: {title}")
+                await asyncio.to_thread(self.frontier.complete, [news_url])
+                return 'unchanged', None
+            if status == 'failed':
+                # 不写入空正文覆盖已有的新闻，放回队列等待重试
+                await asyncio.to_thread(self.frontier.fail, news_url, 'detail fetch failed')
+                return 'failed', None
+            article_content, article_snapshot_hash, article_attachments = detail
+
+            return 'changed', {
+                'title': title,
+                'url': news_url,
+                'date': entry['date'],
+                'source': article_content.get('source', ''),
+                'content': article_content.get('content', ''),
+                'snapshot_hash': article_snapshot_hash,
+                'attachments': article_attachments
+            }
 
-            except Exception as e:
-                logging.error(f"Error parsing news item: {str(e)}")
-                continue
+        except Exception as e:
+            logging.error(f"Error parsing news item {news_url}: {str(e)}")
+            await asyncio.to_thread(self.frontier.fail, news_url, str(e))
+            return 'failed', None
 
-        return news_items
+    async def parse_news_detail(self, url, extractor):
+        """解析新闻详细页面，包括快照和附件
 
-    def parse_news_detail(self, url):
-        """解析新闻详细页面，包括快照和附件"""
-        soup, html_content = self.get_soup(url)
-        if not soup:
-            return {'source': '', 'content': ''}, None, []
+        返回 (状态, (正文信息, 快照哈希, 附件))，页面未变化或抓取、解析失败时只返回状态。
+        """
+        status, html_content, content_hash, fetch_state = await self.fetch_page(url)
+        if status != 'changed':
+            return status, None
 
         try:
             # 保存快照
-            snapshot_hash = self.save_snapshot(url, html_content)
-
-            # 查找附件
-            attachments = self.find_attachments(soup, url)
-            saved_attachments = []
-
-            # 保存附件
-            for attachment in attachments:
-                file_id = self.save_attachment(attachment)
-                if file_id:
-                    saved_attachments.append({
-                        'file_id': file_id,
-                        'url': attachment['url'],
-                        'filename': attachment['filename'],
-                        'title': attachment['title']
-                    })
-
-            # 解析内容
-            source_span = soup.find('span', string=re.compile('来源：'))
-            source = source_span.text.strip() if source_span else ''
-
-            # 扩大正文搜索范围
-            content_div = (
-                soup.find('td', id='txt') or
-                soup.find('div', class_='wp_articlecontent') or
-                soup.find('div', id='content') or
-                soup.find('div', class_='article-content') or
-                soup.find('div', class_='content') or
-                soup.find('div', id='vsb_content') or
-                soup.find('div', id='vsb_content_2') or
-                soup.find('article', class_='blog') or
-                soup.find('article') or
-                soup.find('section', id='main-content')
-            )
-            if content_div:
-                paragraphs = content_div.find_all('p')
-                if paragraphs:
-                    content = '\n'.join([p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)])
-                else:
-                    content = content_div.get_text(separator='\n', strip=True)
-            else:
-                content = ''
-
-            return {
-                'source': source,
-                'content': content
-            }, snapshot_hash, saved_attachments
+            snapshot_hash = await asyncio.to_thread(self.save_snapshot, url, html_content, content_hash)
+
+            # 用站点配置的解析器一次提取正文、来源和附件链接
+            detail = extractor.parse_detail(html_content, url)
+
+            # 附件并发保存
+            attachments = detail['attachments']
+            file_ids = await asyncio.gather(*(self.save_attachment(attachment) for attachment in attachments))
+            saved_attachments = [
+                {
+                    'file_id': file_id,
+                    'url': attachment['url'],
+                    'filename': attachment['filename'],
+                    'title': attachment['title']
+                }
+                for attachment, file_id in zip(attachments, file_ids) if file_id
+            ]
+
+            self.save_fetch_state(url, fetch_state)
+            return 'changed', ({
+                'source': detail['source'],
+                'content': detail['content']
+            }, snapshot_hash, saved_attachments)
 
         except Exception as e:
             logging.error(f"Error parsing detail page {url}: {str(e)}")
-            return {'source': '', 'content': ''}, None, []
+            return 'failed', None
 # -----------------------------------------------------------------------------------------------------------------------
     def save_to_mongodb(self, news_items, batch_number=None):
-        """保存数据到MongoDB"""
-        if not news_items:
-            logging.warning("No data to save to MongoDB")
-            return 0, 0
+        """保存数据到MongoDB：一批新闻合并成一次无序 bulk_write，同时提交缓冲中的快照
 
-        inserted_count = 0
-        updated_count = 0
+        新闻和快照都写入成功后才保存抓取状态；任何写入失败都会抛出异常，调用方不应把这一批标记为完成。
+        """
+        before = self.writer.get_counts(self.news_collection)
 
+        # 同一批次使用同一个时间戳
+        created_at = datetime.now()
         for item in news_items:
-            try:
-                # 添加时间戳和批次信息
-                item['created_at'] = datetime.now()
-                item['batch_number'] = batch_number
-
-                # 使用update_one with upsert=True来避免重复插入
-                result = self.news_collection.update_one(
-                    {'url': item['url']},  # 查询条件
-                    {'$set': item},  # 更新的数据
-                    upsert=True  # 如果不存在则插入
-                )
-
-                if result.upserted_id:
-                    inserted_count += 1
-                elif result.modified_count:
-                    updated_count += 1
+            item['created_at'] = created_at
+            item['batch_number'] = batch_number
+            # upsert 避免重复插入
+            self.writer.add(self.news_collection, UpdateOne({'url': item['url']}, {'$set': item}, upsert=True))
+        self.writer.flush()
+        self.commit_fetch_states()
 
-            except Exception as e:
-                logging.error(f"Error saving to MongoDB: {str(e)}")
-                continue
+        if not news_items:
+            logging.warning("No data to save to MongoDB")
+            return 0, 0
 
+        # 新增和更新数量取自 bulk_write 的结果
+        after = self.writer.get_counts(self.news_collection)
+        inserted_count = after['upserted'] - before['upserted']
+        updated_count = after['modified'] - before['modified']
         logging.info(
             f"Batch {batch_number}: Inserted {inserted_count} new documents, Updated {updated_count} documents")
         return inserted_count, updated_count
 
-    def scrape_batch(self, urls, batch_size=10):
-        """批量抓取新闻并保存到MongoDB"""
-        for i in range(0, len(urls), batch_size):
-            batch_urls = urls[i:i + batch_size]
-            batch_number = i // batch_size + 1
+    async def scrape_batch(self, batch_size=20):
+        """从抓取队列领取列表页，批量抓取新闻并保存到MongoDB"""
+        batch_number = 0
+        while True:
+            jobs = await asyncio.to_thread(self.frontier.lease, self.worker_id, 'list', batch_size)
+            if not jobs:
+                # 其他进程还持有租约时等待；它们若已崩溃，租约过期后任务会被重新领取
+                if await asyncio.to_thread(self.frontier.has_outstanding, 'list'):
+                    await asyncio.sleep(10)
+                    continue
+                break
+            batch_number += 1
+            batch_urls = [job['url'] for job in jobs]
 
-            logging.info(f"Processing batch {batch_number}, pages {i + 1} to {min(i + batch_size, len(urls))}")
+            logging.info(f"Processing batch {batch_number}, {len(batch_urls)} pages")
 
-            # 使用线程池并行处理每批URL
-            with ThreadPoolExecutor(max_workers=5) as executor:
-                batch_results = list(executor.map(self.parse_news_list_page, batch_urls))
+            # 并发处理每批URL（可能来自不同站点），请求速率由抓取器按站点限制
+            batch_results = await asyncio.gather(*(self.crawl_list_job(job) for job in jobs))
 
             # 合并结果
             batch_news = [item for sublist in batch_results if sublist for item in sublist]
 
             # 保存这一批次的数据到MongoDB
-            inserted, updated = self.save_to_mongodb(batch_news, batch_number)
+            try:
+                inserted, updated = await asyncio.to_thread(self.save_to_mongodb, batch_news, batch_number)
+            except Exception as e:
+                # 写入失败：抓取状态不保存，整批放回队列重新抓取
+                logging.error(f"Batch {batch_number} not saved: {str(e)}")
+                self.pending_fetch_states = []
+                for url in batch_urls + [item['url'] for item in batch_news]:
+                    await asyncio.to_thread(self.frontier.fail, url, 'save failed')
+                continue
             logging.info(f"Batch {batch_number} completed: {inserted} new items, {updated} updates")
 
-            # 批次间休息
-            time.sleep(random.uniform(3, 5))
+            # 数据保存之后才标记完成，中途崩溃的任务会在租约过期后重新抓取
+            done_urls = [url for url, result in zip(batch_urls, batch_results) if result is not None]
+            await asyncio.to_thread(self.frontier.complete, done_urls + [item['url'] for item in batch_news])
+            for url, result in zip(batch_urls, batch_results):
+                if result is None:
+                    await asyncio.to_thread(self.frontier.fail, url, 'fetch failed')
+
+    async def crawl_list_job(self, job):
+        extractor = self.extractors.get(job.get('site'))
+        if extractor is None:
+            logging.error(f"No site config for {job['url']} (site={job.get('site')})")
+            return None
+        return await self.parse_news_list_page(job['url'], extractor)
 
     def get_news_count(self):
         """获取数据库中的新闻总数"""
         return self.news_collection.count_documents({})
     
+    async def crawl(self):
+        """在一个共享连接池中完成全部抓取"""
+        async with AsyncFetcher(
+                self.headers,
+                max_concurrency=self.max_concurrency,
+                per_host_concurrency=self.per_host_concurrency,
+                host_rate=self.host_rate,
+                host_burst=self.host_burst
+        ) as fetcher:
+            self.fetcher = fetcher
+            try:
+                await self.scrape_batch()
+            finally:
+                # 中断时也把已缓冲的快照提交；未保存的抓取状态丢弃，对应页面下次重新抓取
+                self.pending_fetch_states = []
+                try:
+                    await asyncio.to_thread(self.writer.flush)
+                except Exception as e:
+                    logging.error(f"Error flushing buffered writes: {str(e)}")
+        self.fetcher = None
+
     def scrape(self):
         """主抓取函数"""
         logging.info("Starting to scrape news...")
-        urls = self.get_page_urls()
-        self.scrape_batch(urls)
+        if self.frontier.has_outstanding('list'):
+            logging.info(f"Resuming unfinished crawl: {self.frontier.stats()}")
+        else:
+            # 上一轮已经结束，开始新一轮
+            self.seed_frontier()
+        asyncio.run(self.crawl())
 
         # 打印最终统计信息
         total_news = self.get_news_count()
@@ -323,7 +348,7 @@ class spider:
 
     def cleanup(self):
         """清理资源"""
-        self.mongo_client.close()
+        close_connections()
 
 
 def main():
@@ -0,0 +1,90 @@
+# 批量写入：按集合缓冲写操作，攒够一批或超过时间间隔后用无序 bulk_write 一次提交
+
+import logging
+import threading
+import time
+
+from pymongo.errors import BulkWriteError
+
+
+class BulkWriter:
+    def __init__(self, batch_size=500, flush_interval=5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._buffers = {}  # 集合名 -> (集合, 待提交的操作)
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._error = None  # 自动提交时发生、尚未报告给调用方的错误
+
+        # 每个集合累计的写入结果
+        self.counts = {}
+
+    def add(self, collection, operation):
+        """加入一个写操作（InsertOne/UpdateOne...），达到批量大小或时间间隔时自动提交"""
+        with self._lock:
+            _, operations = self._buffers.setdefault(collection.name, (collection, []))
+            operations.append(operation)
+            full = len(operations) >= self.batch_size
+        if full:
+            self._auto_flush(collection)
+        elif time.monotonic() - self._last_flush >= self.flush_interval:
+            self._auto_flush()
+
+    def _auto_flush(self, collection=None):
+        # 自动提交的失败先记下来，调用方下一次显式 flush 时抛出
+        try:
+            self.flush(collection)
+        except Exception as e:
+            with self._lock:
+                self._error = self._error or e
+
+    def flush(self, collection=None):
+        """提交缓冲的写操作；collection 为空时提交所有集合
+
+        本次提交或之前的自动提交有写入失败时抛出异常，调用方据此判断这一批数据是否已经保存。
+        """
+        with self._lock:
+            names = [collection.name] if collection is not None else list(self._buffers)
+            pending = [self._buffers.pop(name) for name in names if name in self._buffers]
+            if collection is None:
+                self._last_flush = time.monotonic()
+        error = None
+        for target, operations in pending:
+            if operations:
+                try:
+                    self._write(target, operations)
+                except Exception as e:
+                    error = error or e
+        with self._lock:
+            error = error or self._error
+            self._error = None
+        if error is not None:
+            raise error
+
+    def _write(self, collection, operations):
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            # 无序写入时其余操作仍会执行，计入成功的部分后再抛出
+            details = e.details
+            logging.error(f"Bulk write to {collection.name}: {len(details.get('writeErrors', []))} errors, "
+                          f"first: {details.get('writeErrors', [{}])[0].get('errmsg')}")
+            self._count(collection, details)
+            raise
+        except Exception as e:
+            logging.error(f"Bulk write to {collection.name} failed: {str(e)}")
+            raise
+        self._count(collection, details)
+
+    def _count(self, collection, details):
+        with self._lock:
+            counts = self.counts.setdefault(collection.name, {'inserted': 0, 'upserted': 0, 'modified': 0})
+            counts['inserted'] += details.get('nInserted', 0)
+            counts['upserted'] += details.get('nUpserted', 0)
+            counts['modified'] += details.get('nModified', 0)
+
+    def get_counts(self, collection):
+        with self._lock:
+            return dict(self.counts.get(collection.name, {'inserted': 0, 'upserted': 0, 'modified': 0}))
@@ -1,11 +1,15 @@
-from pymongo import MongoClient, ASCENDING
+import os
+import sys
+from pymongo import ASCENDING
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.connections import get_mongo_db
 
 def init_user_database():
     """初始化用户相关的所有数据库集合"""
     try:
         # 连接数据库
-        client = MongoClient('localhost', 27017)
-        db = client['nku_news'] 
+        db = get_mongo_db()
 
         # 1. 用户集合 (users)
         if 'users' not in db.list_collection_names():